@@ -1,50 +1,243 @@
 """Activity log for tracking repository operations."""
+import atexit
 import json
 import os
-from datetime import datetime
-from typing import List, Dict, Optional
+import queue
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; single-process use only
+    fcntl = None
+
+
+def _lock_file(f):
+    """Take an exclusive advisory lock shared with other worker processes."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+# (whole second, formatted "YYYY-MM-DDTHH:MM:SS") for the most recent timestamp
+_ts_prefix: Tuple[int, str] = (-1, "")
+
+
+def _utc_timestamp() -> str:
+    """Current UTC time in ISO 8601 form (naive, microsecond precision).
+    
+    Equivalent to ``datetime.utcnow().isoformat()`` but reuses the formatted
+    date/time part while the second hasn't changed.
+    """
+    global _ts_prefix
+    ns = time.time_ns()
+    sec, micros = divmod(ns // 1000, 1_000_000)
+    cached_sec, prefix = _ts_prefix
+    if sec != cached_sec:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+        _ts_prefix = (sec, prefix)
+    return f"{prefix}.{micros:06d}"
 
 
 class ActivityLog:
-    """Manages activity logging for repository operations."""
+    """Manages activity logging for repository operations.
+    
+    Entries are stored as JSON Lines (one JSON object per line) so that logging an
+    operation is a single append instead of a full read/rewrite of the file. The
+    file is trimmed back to ``max_entries`` every ``trim_interval`` writes.
+    """
+    
+    QUEUE_SIZE = 10_000
+    WRITE_BATCH_SIZE = 256
     
     def __init__(self, log_file: str = "/app/activity_log.json", max_entries: int = 1000):
         """Initialize activity log."""
         self.log_file = log_file
         self.max_entries = max_entries
+        # Trim once the file may have grown by ~10% past max_entries
+        self.trim_interval = max(1, max_entries // 10)
+        self._writes_since_trim = 0
+        self._lock = threading.Lock()
+        # Decoded entries (a ring buffer of max_entries) plus the (mtime_ns, size) of
+        # the file they were read from. The writer appends in place, so readers must
+        # iterate it while holding the lock.
+        self._logs_cache: Optional[Deque[Dict]] = None
+        self._file_sig: Optional[Tuple[int, int]] = None
+        # repo name -> that repo's entries (oldest first), kept in step with the cache
+        self._by_repo: Dict[str, Deque[Dict]] = {}
+        # Running status/operation/repo counts over the cached entries, so get_stats
+        # doesn't rescan every entry
+        self._status_counts: Counter = Counter()
+        self._op_counts: Counter = Counter()
+        self._repo_counts: Counter = Counter()
+        # Append handle kept open across writes; reopened if the file is replaced
+        self._fp = None
+        self._fp_ino: Optional[int] = None
+        # Entries waiting for the background writer thread
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self._writer: Optional[threading.Thread] = None
+        self.dropped = 0
+        # Don't lose queued entries when the process exits normally
+        atexit.register(self.flush)
         self._ensure_log_file()
     
     def _ensure_log_file(self):
-        """Ensure log file exists."""
+        """Ensure log file exists (converting a legacy JSON array file to JSON Lines)."""
         if not os.path.exists(self.log_file):
-            with open(self.log_file, 'w') as f:
-                json.dump([], f)
+            open(self.log_file, 'a').close()
+            return
+        
+        try:
+            with open(self.log_file, 'r') as f:
+                head = f.read(1)
+                while head and head.isspace():
+                    head = f.read(1)
+                if head != '[':
+                    return
+                f.seek(0)
+                legacy = json.load(f)
+        except Exception:
+            return
+        self._save_logs(legacy if isinstance(legacy, list) else [])
+    
+    def _temp_path(self) -> str:
+        # Per-process name: several gunicorn workers share the same log file
+        return f"{self.log_file}.{os.getpid()}.tmp"
+    
+    @staticmethod
+    def _stat_sig(st: os.stat_result) -> Tuple[int, int]:
+        return (st.st_mtime_ns, st.st_size)
+    
+    def _load_logs(self) -> Deque[Dict]:
+        """Return logs, re-reading the file only when it changed on disk.
+        
+        Another process (e.g. a second gunicorn worker) may append to the same file,
+        so the cache is keyed on the file's mtime and size rather than trusted blindly.
+        """
+        self.flush()
+        try:
+            sig = self._stat_sig(os.stat(self.log_file))
+        except OSError:
+            return deque()
+        cached = self._logs_cache
+        if cached is not None and sig == self._file_sig:
+            return cached
+        
+        logs = self._read_logs()
+        with self._lock:
+            self._set_cache(logs, sig)
+        return logs
+    
+    def _set_cache(self, logs: Deque[Dict], sig: Tuple[int, int]):
+        """Replace cached entries and rebuild the per-repo index (caller holds the lock)."""
+        by_repo = defaultdict(deque)
+        for log in logs:
+            by_repo[log.get('repo')].append(log)
+        self._logs_cache = logs
+        self._by_repo = dict(by_repo)
+        self._file_sig = sig
+        self._status_counts = Counter()
+        self._op_counts = Counter()
+        self._repo_counts = Counter()
+        self._tally(logs)
     
-    def _load_logs(self) -> List[Dict]:
-        """Load logs from file."""
+    def _tally(self, entries: Iterable[Dict], sign: int = 1):
+        """Add entries to (or with sign=-1 remove them from) the stat counters.
+        
+        Caller must hold ``self._lock``.
+        """
+        for log in entries:
+            for counter, key in ((self._status_counts, log.get('status')),
+                                 (self._op_counts, log.get('operation', 'unknown')),
+                                 (self._repo_counts, log.get('repo', 'unknown'))):
+                count = counter[key] + sign
+                if count > 0:
+                    counter[key] = count
+                else:
+                    del counter[key]
+    
+    def _read_logs(self) -> Deque[Dict]:
+        """Read and decode the log file.
+        
+        The file may run past max_entries until the next trim; the bounded deque
+        keeps only the newest entries as it goes.
+        """
+        logs = deque(maxlen=self.max_entries)
         try:
             with open(self.log_file, 'r') as f:
-                return json.load(f)
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        logs.append(json.loads(line))
+                    except ValueError:
+                        # Skip a partially written line rather than losing the whole log
+                        continue
         except Exception:
-            return []
+            return deque(maxlen=self.max_entries)
+        return logs
     
-    def _save_logs(self, logs: List[Dict]):
-        """Save logs to file."""
+    def _save_logs(self, logs: Iterable[Dict]):
+        """Rewrite the log file with the most recent entries."""
         try:
             # Keep only the most recent entries
-            if len(logs) > self.max_entries:
-                logs = logs[-self.max_entries:]
+            logs = deque(logs, maxlen=self.max_entries)
             
-            with open(self.log_file, 'w') as f:
-                json.dump(logs, f, indent=2)
+            # Write to a temporary file first, then rename (atomic operation)
+            # Encode once and issue a single write
+            data = ''.join(json.dumps(log, separators=(',', ':')) + '\n' for log in logs)
+            temp_file = self._temp_path()
+            with open(temp_file, 'w') as f:
+                f.write(data)
+            os.replace(temp_file, self.log_file)
+            with self._lock:
+                self._set_cache(logs, self._stat_sig(os.stat(self.log_file)))
         except Exception as e:
             print(f"Error saving activity log: {e}")
     
+    def _trim_logs(self):
+        """Truncate the log file to the last ``max_entries`` lines.
+        
+        Caller must hold ``self._lock``.
+        """
+        try:
+            with open(self.log_file, 'r') as f:
+                # Hold the file lock across read + replace so no other worker's
+                # append lands in the old file after we have read it
+                _lock_file(f)
+                st = os.fstat(f.fileno())
+                if st.st_ino != os.stat(self.log_file).st_ino:
+                    return  # Another worker has just replaced it
+                prev_sig = self._stat_sig(st)
+                tail = deque(f, maxlen=self.max_entries)
+                temp_file = self._temp_path()
+                with open(temp_file, 'w') as out:
+                    out.writelines(tail)
+                os.replace(temp_file, self.log_file)
+            self._close_fp()
+            # The cached entries are already the newest max_entries; only the
+            # signature moves (unless the file had changed under us)
+            if prev_sig == self._file_sig:
+                self._file_sig = self._stat_sig(os.stat(self.log_file))
+        except Exception as e:
+            print(f"Error trimming activity log: {e}")
+    
     def log_operation(self, operation: str, repo: str, status: str, 
                      message: Optional[str] = None, details: Optional[Dict] = None):
-        """Log an operation."""
+        """Log an operation.
+        
+        The entry is queued and written by a background thread, so callers (e.g. pulls)
+        never wait on disk I/O. Reads wait for queued entries first.
+        """
         log_entry = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _utc_timestamp(),
             "operation": operation,  # 'pull', 'pull_all', 'schedule_pull'
             "repo": repo,
             "status": status,  # 'success', 'error', 'warning', 'debug'
@@ -52,12 +245,126 @@ class ActivityLog:
             "details": details or {}
         }
         
-        logs = self._load_logs()
-        logs.append(log_entry)
-        self._save_logs(logs)
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(log_entry)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1:
+                print("Activity log queue is full; dropping entries")
         
         return log_entry
     
+    def flush(self):
+        """Block until every queued entry has been written."""
+        if self._queue.unfinished_tasks:
+            self._queue.join()
+    
+    def _ensure_writer(self):
+        # Started lazily so the thread belongs to the process that logs (gunicorn forks)
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(
+                    target=self._drain, name="activity-log-writer", daemon=True
+                )
+                self._writer.start()
+    
+    def _drain(self):
+        """Writer thread: take queued entries in batches and append each batch at once."""
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                print(f"Error saving activity log: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    def _write_batch(self, batch: List[Dict]):
+        """Append entries to the file and to the in-memory cache."""
+        data = ''.join(json.dumps(entry, separators=(',', ':')) + '\n' for entry in batch)
+        
+        with self._lock:
+            try:
+                fp, st = self._append_handle()
+                try:
+                    before = self._stat_sig(st)
+                    fp.write(data)
+                    fp.flush()
+                    after = self._stat_sig(os.fstat(fp.fileno()))
+                finally:
+                    _unlock_file(fp)
+            except Exception:
+                self._close_fp()
+                raise
+            
+            # Extend the cache in place of a re-read when nobody else wrote in between
+            logs = self._logs_cache
+            if logs is not None and before == self._file_sig:
+                for entry in batch:
+                    if len(logs) == logs.maxlen:
+                        # The ring buffer drops its oldest entry on append; that entry
+                        # is also the oldest for its repo
+                        old = logs[0]
+                        self._tally((old,), -1)
+                        key = old.get('repo')
+                        repo_logs = self._by_repo.get(key)
+                        if repo_logs:
+                            repo_logs.popleft()
+                            if not repo_logs:
+                                del self._by_repo[key]
+                    logs.append(entry)
+                    self._by_repo.setdefault(entry.get('repo'), deque()).append(entry)
+                    self._tally((entry,))
+                self._file_sig = after
+            
+            self._writes_since_trim += len(batch)
+            if self._writes_since_trim >= self.trim_interval:
+                self._writes_since_trim = 0
+                self._trim_logs()
+    
+    def _append_handle(self):
+        """Return the append handle, file-locked, and its current stat (caller holds the lock).
+        
+        The file is reopened when it was replaced since the last write, e.g. trimmed by
+        another worker process. The caller must release it with ``_unlock_file``.
+        """
+        while True:
+            if self._fp is None:
+                self._fp = open(self.log_file, 'a')
+                self._fp_ino = os.fstat(self._fp.fileno()).st_ino
+            _lock_file(self._fp)
+            try:
+                current_ino = os.stat(self.log_file).st_ino
+            except FileNotFoundError:
+                current_ino = None
+            if current_ino == self._fp_ino:
+                return self._fp, os.fstat(self._fp.fileno())
+            _unlock_file(self._fp)
+            self._close_fp()
+    
+    def _close_fp(self):
+        if self._fp is not None:
+            try:
+                self._fp.close()
+            except Exception:
+                pass
+        self._fp = None
+        self._fp_ino = None
+    
+    def close(self):
+        """Close the append handle (it is reopened on the next write)."""
+        with self._lock:
+            self._close_fp()
+    
     def log_debug(self, message: str, repo: Optional[str] = None, details: Optional[Dict] = None):
         """Log a debug message."""
         return self.log_operation(
@@ -74,25 +381,33 @@ class ActivityLog:
         """Get activity logs with optional filtering."""
         logs = self._load_logs()
         
-        # Filter by repo if specified
-        if repo:
-            logs = [log for log in logs if log.get('repo') == repo]
-        
-        # Filter by operation if specified
-        if operation:
-            logs = [log for log in logs if log.get('operation') == operation]
-        
-        # Filter by status if specified
-        if status:
-            logs = [log for log in logs if log.get('status') == status]
-        
-        # Filter out debug logs if include_debug is False
-        if not include_debug:
-            logs = [log for log in logs if log.get('status') != 'debug']
+        def matches(log: Dict) -> bool:
+            if repo and log.get('repo') != repo:
+                return False
+            if operation and log.get('operation') != operation:
+                return False
+            if status and log.get('status') != status:
+                return False
+            # Filter out debug logs if include_debug is False
+            if not include_debug and log.get('status') == 'debug':
+                return False
+            return True
         
-        # Sort by timestamp (newest first) and limit
-        logs.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        return logs[:limit]
+        # Entries are appended as they happen, so file order is timestamp order:
+        # walk from the newest end and stop once `limit` matches are found.
+        result = []
+        if limit <= 0:
+            return result
+        with self._lock:
+            if repo and logs is self._logs_cache:
+                # Only scan this repo's own entries
+                logs = self._by_repo.get(repo, ())
+            for log in reversed(logs):
+                if matches(log):
+                    result.append(log)
+                    if len(result) >= limit:
+                        break
+        return result
     
     def get_repo_history(self, repo: str, limit: int = 50) -> List[Dict]:
         """Get history for a specific repository."""
@@ -102,23 +417,24 @@ class ActivityLog:
         """Get statistics from activity logs."""
         logs = self._load_logs()
         
-        total_operations = len(logs)
-        successful = len([log for log in logs if log.get('status') == 'success'])
-        failed = len([log for log in logs if log.get('status') == 'error'])
-        
-        # Count by operation type
-        operation_counts = {}
-        for log in logs:
-            op = log.get('operation', 'unknown')
-            operation_counts[op] = operation_counts.get(op, 0) + 1
-        
-        # Count by repository
-        repo_counts = {}
-        for log in logs:
-            repo = log.get('repo', 'unknown')
-            repo_counts[repo] = repo_counts.get(repo, 0) + 1
+        with self._lock:
+            if logs is self._logs_cache:
+                # Counters are maintained as entries are added and evicted
+                status_counts = dict(self._status_counts)
+                operation_counts = dict(self._op_counts)
+                repo_counts = dict(self._repo_counts)
+            else:
+                # The log couldn't be read (or changed just now); count directly
+                status_counts = Counter(log.get('status') for log in logs)
+                operation_counts = dict(Counter(log.get('operation', 'unknown') for log in logs))
+                repo_counts = dict(Counter(log.get('repo', 'unknown') for log in logs))
+            
+            total_operations = len(logs)
+            last_activity = logs[-1].get('timestamp') if logs else None
         
-        debug_count = len([log for log in logs if log.get('status') == 'debug'])
+        successful = status_counts.get('success', 0)
+        failed = status_counts.get('error', 0)
+        debug_count = status_counts.get('debug', 0)
         
         return {
             "total_operations": total_operations,
@@ -128,6 +444,5 @@ class ActivityLog:
             "success_rate": (successful / total_operations * 100) if total_operations > 0 else 0,
             "operation_counts": operation_counts,
             "repo_counts": repo_counts,
-            "last_activity": logs[-1].get('timestamp') if logs else None
+            "last_activity": last_activity
         }
-
@@ -1,23 +1,31 @@
 """In-memory caching for repository scan results."""
+import heapq
 import time
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from threading import Lock
 
 
 class CacheManager:
     """Manages in-memory cache for repository data with TTL support."""
     
-    def __init__(self, ttl_seconds: int = 600):
+    def __init__(self, ttl_seconds: int = 600, stale_seconds: Optional[int] = None):
         """Initialize cache manager with TTL.
         
         Args:
             ttl_seconds: Time-to-live in seconds (default: 600 = 10 minutes)
+            stale_seconds: How long past its TTL an entry is kept for get_stale()
+                (None = same as the TTL)
         """
         self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
         self._cache: Dict[str, Dict[str, Any]] = {}
+        # Min-heap of (expires_at, key) so expired entries that are never read
+        # again still get dropped; stale heap items are skipped on pop
+        self._expiry_heap: List[Tuple[float, str]] = []
         self._lock = Lock()
         self._stats = {
             "hits": 0,
+            "stale_hits": 0,
             "misses": 0,
             "sets": 0,
             "invalidations": 0
@@ -28,38 +36,93 @@ class CacheManager:
         
         Args:
             key: Cache key (e.g., 'all' for all repos, or repo name)
-            
+        
         Returns:
             Cached data if valid, None otherwise
         """
+        # Lock-free read: a single dict lookup is atomic, and entries are only ever
+        # replaced whole, so the lock is reserved for mutations. Hit/miss counters
+        # are updated without the lock and may undercount under heavy contention.
+        entry = self._cache.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        
+        if not self._is_entry_valid(entry):
+            # Entry expired; past its stale window too, remove it (unless another
+            # thread has just replaced it)
+            if time.time() >= entry["stale_until"]:
+                with self._lock:
+                    if self._cache.get(key) is entry:
+                        del self._cache[key]
+            self._stats["misses"] += 1
+            return None
+        
+        self._stats["hits"] += 1
+        return entry["data"]
+    
+    def get_stale(self, key: str) -> Tuple[Optional[Any], bool]:
+        """Retrieve cached data even if its TTL has passed (stale-while-revalidate).
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            (data, is_stale): data is None on a miss or once the stale window is over;
+            is_stale is True when the TTL has passed and the caller should refresh
+        """
+        entry = self._cache.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None, False
+        
+        now = time.time()
+        if now < entry["expires_at"]:
+            self._stats["hits"] += 1
+            return entry["data"], False
+        if now < entry["stale_until"]:
+            self._stats["stale_hits"] += 1
+            return entry["data"], True
+        
         with self._lock:
-            if key not in self._cache:
-                self._stats["misses"] += 1
-                return None
-            
-            entry = self._cache[key]
-            if not self._is_entry_valid(entry):
-                # Entry expired, remove it
+            if self._cache.get(key) is entry:
                 del self._cache[key]
-                self._stats["misses"] += 1
-                return None
-            
-            self._stats["hits"] += 1
-            return entry["data"]
+        self._stats["misses"] += 1
+        return None, False
     
     def set(self, key: str, value: Any):
-        """Store data in cache with current timestamp.
+        """Store data in cache with an absolute expiry deadline.
         
         Args:
             key: Cache key
             value: Data to cache
         """
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        stale_until = expires_at + (self.ttl_seconds if self.stale_seconds is None else self.stale_seconds)
         with self._lock:
             self._cache[key] = {
                 "data": value,
-                "timestamp": time.time()
+                "expires_at": expires_at,
+                "stale_until": stale_until
             }
             self._stats["sets"] += 1
+            heapq.heappush(self._expiry_heap, (stale_until, key))
+            self._evict_expired(now)
+    
+    def _evict_expired(self, now: float):
+        """Drop entries whose stale window has passed. Caller must hold the lock.
+        
+        Args:
+            now: Current time used as the expiry cutoff
+        """
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            _, key = heapq.heappop(heap)
+            entry = self._cache.get(key)
+            # The key may have been re-set with a later deadline since this item was pushed
+            if entry is not None and entry["stale_until"] <= now:
+                del self._cache[key]
     
     def invalidate(self, key: str):
         """Remove specific cache entry.
@@ -77,6 +140,7 @@ class CacheManager:
         with self._lock:
             count = len(self._cache)
             self._cache.clear()
+            self._expiry_heap.clear()
             self._stats["invalidations"] += count
     
     def is_valid(self, key: str) -> bool:
@@ -84,26 +148,25 @@ class CacheManager:
         
         Args:
             key: Cache key to check
-            
+        
         Returns:
             True if entry exists and is valid, False otherwise
         """
-        with self._lock:
-            if key not in self._cache:
-                return False
-            return self._is_entry_valid(self._cache[key])
+        entry = self._cache.get(key)
+        if entry is None:
+            return False
+        return self._is_entry_valid(entry)
     
     def _is_entry_valid(self, entry: Dict) -> bool:
         """Check if cache entry is still within TTL.
         
         Args:
             entry: Cache entry dictionary
-            
+        
         Returns:
             True if entry is valid, False if expired
         """
-        elapsed = time.time() - entry["timestamp"]
-        return elapsed < self.ttl_seconds
+        return time.time() < entry["expires_at"]
     
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics.
@@ -117,6 +180,7 @@ class CacheManager:
             
             return {
                 "hits": self._stats["hits"],
+                "stale_hits": self._stats["stale_hits"],
                 "misses": self._stats["misses"],
                 "sets": self._stats["sets"],
                 "invalidations": self._stats["invalidations"],
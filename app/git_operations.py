@@ -1,29 +1,43 @@
 """Git operations (pull, etc.)"""
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+from concurrent.futures import ThreadPoolExecutor
 import os
 import git
-from git import Repo, InvalidGitRepositoryError, GitCommandError
+from git import Git, Repo, InvalidGitRepositoryError, GitCommandError
+
+from app.git_utils import FETCH_GIT_OPTIONS, has_git_dir
+
+T = TypeVar("T")
+
+# Configure git to use SSH with proper settings (once, at import).
+# Strict host key checking accepts new hosts on first connection, which helps in
+# containerized environments. ControlMaster/ControlPersist keep one SSH connection per
+# host open for 60s so pulling/fetching many repos from the same host doesn't redo the
+# handshake each time.
+os.environ.setdefault(
+    'GIT_SSH_COMMAND',
+    "ssh -o StrictHostKeyChecking=accept-new -o UserKnownHostsFile=/home/appuser/.ssh/known_hosts"
+    " -o ControlMaster=auto -o ControlPath=/tmp/git-ssh-%r@%h:%p -o ControlPersist=60s"
+)
 
 
 class GitOperations:
     """Handle git operations like pull."""
     
-    def __init__(self, base_path: str = "/git", activity_log=None, cache_manager=None, fetch_rate_limiter=None):
-        """Initialize with base path."""
+    def __init__(self, base_path: str = "/git", activity_log=None, cache_manager=None, fetch_rate_limiter=None,
+                 scanner=None, executor: Optional[ThreadPoolExecutor] = None):
+        """Initialize with base path.
+        
+        scanner: optional GitScanner used by pull_all_repos to refresh each pulled repo's info
+        executor: optional long-lived thread pool for concurrent pulls (instead of one per call)
+        """
         self.base_path = Path(base_path)
         self.activity_log = activity_log
         self.cache_manager = cache_manager
         self._fetch_rate_limiter = fetch_rate_limiter
-        # Configure git to use SSH with proper settings
-        self._configure_git_ssh()
-    
-    def _configure_git_ssh(self):
-        """Configure git to use SSH properly."""
-        # Set GIT_SSH_COMMAND to use SSH with strict host key checking disabled for first connection
-        # This helps with containerized environments
-        ssh_command = "ssh -o StrictHostKeyChecking=accept-new -o UserKnownHostsFile=/home/appuser/.ssh/known_hosts"
-        os.environ.setdefault('GIT_SSH_COMMAND', ssh_command)
+        self._scanner = scanner
+        self.executor = executor
     
     def pull_repo(
         self,
@@ -45,16 +59,21 @@ class GitOperations:
         """
         repo_path = self.base_path / repo_name
         
-        if not (repo_path / ".git").exists():
+        if not has_git_dir(repo_path):
             return {
                 "success": False,
                 "error": f"Repository {repo_name} not found"
             }
         
         try:
-            repo = Repo(str(repo_path))
+            # Plain git commands (one subprocess each) instead of building a Repo object graph
+            g = Git(str(repo_path))
             
-            if not repo.remotes:
+            try:
+                remotes = g.remote().split()
+            except GitCommandError:
+                raise InvalidGitRepositoryError(str(repo_path))
+            if not remotes:
                 return {
                     "success": False,
                     "error": "No remote configured"
@@ -62,7 +81,7 @@ class GitOperations:
             
             # Uncommitted / untracked changes can be overwritten by merge/rebase — block unless forced
             if block_on_dirty and not force:
-                dirty = repo.is_dirty(index=True, working_tree=True, untracked_files=True)
+                dirty = bool(g.status('--porcelain', '--untracked-files=normal'))
                 if dirty:
                     return {
                         "success": False,
@@ -72,19 +91,19 @@ class GitOperations:
                         "is_dirty": True,
                     }
             
-            # Get current branch
-            try:
-                current_branch = repo.active_branch.name
-            except TypeError:
+            # Get current branch ("HEAD" means detached)
+            current_branch = g.rev_parse('--abbrev-ref', 'HEAD')
+            if current_branch == "HEAD":
                 return {
                     "success": False,
                     "error": "Repository is in detached HEAD state"
                 }
             
-            # Fetch first
+            # Fetch first (paced like every other fetch; pulls can run in parallel)
             try:
-                origin = repo.remotes.origin
-                origin.fetch()
+                if self._fetch_rate_limiter:
+                    self._fetch_rate_limiter.acquire(timeout=600.0)
+                g(**FETCH_GIT_OPTIONS).fetch('origin')
             except GitCommandError as e:
                 return {
                     "success": False,
@@ -93,26 +112,43 @@ class GitOperations:
             
             # Check if branches have diverged
             is_diverged = False
+            up_to_date = False
+            commits_behind = 0
             try:
                 remote_branch = f"origin/{current_branch}"
-                if remote_branch in repo.refs:
-                    local_commit = repo.head.commit
-                    remote_commit = repo.refs[remote_branch].commit
-                    
-                    # Check if branches have diverged (both ahead and behind)
-                    commits_ahead = list(repo.iter_commits(f"{remote_commit.hexsha}..{local_commit.hexsha}"))
-                    commits_behind = list(repo.iter_commits(f"{local_commit.hexsha}..{remote_commit.hexsha}"))
-                    
-                    is_diverged = len(commits_ahead) > 0 and len(commits_behind) > 0
+                # One walk of the symmetric difference: "<ahead>\t<behind>"
+                counts = g.rev_list('--left-right', '--count', f"HEAD...{remote_branch}").split()
+                commits_ahead, commits_behind = int(counts[0]), int(counts[1])
+                
+                # Check if branches have diverged (both ahead and behind)
+                is_diverged = commits_ahead > 0 and commits_behind > 0
+                up_to_date = commits_behind == 0
             except Exception:
-                # If we can't determine divergence, proceed with normal pull
+                # No origin/<branch> yet: can't determine divergence, proceed with normal pull
                 pass
             
+            # Nothing new on the remote: skip the merge/rebase and keep the cached status
+            if up_to_date:
+                result = {
+                    "success": True,
+                    "message": f"{repo_name} is already up to date",
+                    "updates": 0,
+                    "branch": current_branch,
+                    "strategy": pull_strategy
+                }
+                if self.activity_log:
+                    self.activity_log.log_operation(
+                        'pull', repo_name, 'success',
+                        result["message"],
+                        {"updates": 0, "branch": current_branch, "strategy": pull_strategy}
+                    )
+                return result
+            
             # Handle diverged branches based on strategy
             if is_diverged and pull_strategy == "reset":
                 try:
                     # Reset to match remote exactly (discards local changes)
-                    repo.head.reset(f"origin/{current_branch}", index=True, working_tree=True)
+                    g.reset('--hard', f"origin/{current_branch}")
                     result = {
                         "success": True,
                         "message": f"Successfully reset {repo_name} to match remote (local changes discarded)",
@@ -144,17 +180,20 @@ class GitOperations:
             
             # Try pull with specified strategy
             try:
+                # origin/<branch> was just fetched above; integrate it locally rather than
+                # `git pull`, which would fetch from the remote a second time
                 if pull_strategy == "rebase":
                     # Rebase strategy
-                    pull_info = origin.pull(current_branch, rebase=True)
+                    g.rebase(f"origin/{current_branch}")
                 else:
                     # Default merge strategy
-                    pull_info = origin.pull(current_branch)
+                    g.merge('--no-edit', f"origin/{current_branch}")
                 
                 result = {
                     "success": True,
                     "message": f"Successfully pulled {repo_name}",
-                    "updates": len(pull_info) if pull_info else 0,
+                    # Remote commits brought in by this pull
+                    "updates": commits_behind,
                     "branch": current_branch,
                     "strategy": pull_strategy
                 }
@@ -189,7 +228,7 @@ class GitOperations:
                     "diverged": is_diverged,
                     "conflict": "CONFLICT" in error_msg.upper() or "conflict" in error_msg.lower()
                 }
-                
+        
         except InvalidGitRepositoryError:
             error_msg = f"Invalid git repository: {repo_name}"
             if self.activity_log:
@@ -207,12 +246,36 @@ class GitOperations:
                 "error": error_msg
             }
     
+    def map_pulls(self, pull_one: Callable[[str], T], repo_names: List[str],
+                  parallel_workers: Optional[int]) -> List[T]:
+        """Run pull_one for every repository, several at a time.
+        
+        Pulls are network-bound, so they overlap: on the shared executor when there is one,
+        otherwise on a pool for this call. Each fetch still waits for the fetch rate limiter.
+        
+        Args:
+            pull_one: Called with each repository name
+            repo_names: Repositories to pull
+            parallel_workers: Number of pulls at once (None or 1 = sequential)
+        
+        Returns:
+            pull_one's results, in the order of repo_names
+        """
+        workers = min(parallel_workers or 1, len(repo_names))
+        if workers > 1 and self.executor is not None:
+            return list(self.executor.map(pull_one, repo_names))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(pull_one, repo_names))
+        return [pull_one(repo_name) for repo_name in repo_names]
+    
     def pull_all_repos(
         self,
         repo_names: list,
         pull_strategy: str = "merge",
         force: bool = False,
         block_on_dirty: bool = True,
+        parallel_workers: Optional[int] = 8,
     ) -> Dict:
         """Pull updates for all repositories.
         
@@ -221,6 +284,11 @@ class GitOperations:
             pull_strategy: Strategy to use when branches have diverged (see pull_repo for details)
             force: Passed to each pull_repo
             block_on_dirty: Passed to each pull_repo
+            parallel_workers: Number of repos pulled concurrently (None or 1 = sequential)
+        
+        Returns:
+            Summary dictionary. With a scanner, "repos" also holds the refreshed info of
+            each successfully pulled repo (rescanned in the same worker, right after its pull)
         """
         results = {
             "success": True,
@@ -231,13 +299,31 @@ class GitOperations:
             "results": []
         }
         
-        for repo_name in repo_names:
-            result = self.pull_repo(
-                repo_name,
-                pull_strategy=pull_strategy,
-                force=force,
-                block_on_dirty=block_on_dirty,
-            )
+        def pull_one(repo_name: str) -> Tuple[Dict, Optional[Dict]]:
+            try:
+                result = self.pull_repo(
+                    repo_name,
+                    pull_strategy=pull_strategy,
+                    force=force,
+                    block_on_dirty=block_on_dirty,
+                )
+            except Exception as e:
+                return {"success": False, "error": str(e)}, None
+            
+            info = None
+            if result["success"] and self._scanner:
+                try:
+                    info = self._scanner.get_repo_info(repo_name)
+                except Exception as e:
+                    print(f"Error refreshing {repo_name} after pull: {e}")
+            return result, info
+        
+        pulled = self.map_pulls(pull_one, repo_names, parallel_workers)
+        
+        repos = []
+        for repo_name, (result, info) in zip(repo_names, pulled):
+            if info:
+                repos.append(info)
             result["repo"] = repo_name
             results["results"].append(result)
             
@@ -249,9 +335,11 @@ class GitOperations:
                 if result.get("code") == "dirty_worktree":
                     results["skipped_dirty"] += 1
         
-        # Invalidate entire cache after bulk pull
+        # Invalidate entire cache after bulk pull, keeping the entries just rescanned
         if self.cache_manager:
             self.cache_manager.invalidate_all()
+            for info in repos:
+                self.cache_manager.set(info["name"], info)
         
         # Log bulk operation
         if self.activity_log:
@@ -262,12 +350,14 @@ class GitOperations:
                 results
             )
         
+        if self._scanner:
+            results["repos"] = repos
         return results
-
+    
     def fetch_repo(self, repo_name: str) -> Dict:
         """Fetch remote refs only (no merge). Updates remote-tracking branches."""
         repo_path = self.base_path / repo_name
-        if not (repo_path / ".git").exists():
+        if not has_git_dir(repo_path):
             return {"success": False, "error": f"Repository {repo_name} not found"}
         try:
             repo = Repo(str(repo_path))
@@ -276,10 +366,8 @@ class GitOperations:
             try:
                 if self._fetch_rate_limiter:
                     self._fetch_rate_limiter.acquire(timeout=600.0)
-                if "origin" in repo.remotes:
-                    repo.remotes.origin.fetch()
-                else:
-                    repo.remotes[0].fetch()
+                remote_name = "origin" if "origin" in repo.remotes else repo.remotes[0].name
+                repo.git(**FETCH_GIT_OPTIONS).fetch(remote_name)
             except GitCommandError as e:
                 return {"success": False, "error": f"Fetch failed: {str(e)}"}
             if self.cache_manager:
@@ -292,7 +380,7 @@ class GitOperations:
             return {"success": True, "message": f"Fetched remotes for {repo_name}"}
         except Exception as e:
             return {"success": False, "error": str(e)}
-
+    
     def fetch_repos(self, repo_names: list) -> Dict:
         """Fetch multiple repositories."""
         out = {
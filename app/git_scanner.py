@@ -1,101 +1,206 @@
 """Git repository scanning and status detection."""
 import os
+import threading
+from configparser import NoOptionError, NoSectionError
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import git
-from git import Repo, InvalidGitRepositoryError
+from git import Git, Repo, InvalidGitRepositoryError
 
-from app.git_utils import remote_url_to_web
+from app.git_utils import FETCH_GIT_OPTIONS, has_git_dir, remote_url_to_web
 
 
 class GitScanner:
     """Scans and analyzes git repositories."""
     
-    def __init__(self, base_path: str = "/git", fetch_rate_limiter=None):
+    # Default worker cap: per-repo work is mostly waiting on git subprocesses and disk,
+    # but more than a handful of threads just contends for the same I/O
+    DEFAULT_MAX_WORKERS = 8
+    # .git probes are timed over the first PROBE_SAMPLE directories; above SLOW_PROBE_SECONDS
+    # each (network filesystems; local probes take microseconds) the rest run concurrently
+    PROBE_SAMPLE = 16
+    SLOW_PROBE_SECONDS = 0.0002
+    # Open Repo handles kept for reuse (least recently used are closed first)
+    REPO_HANDLE_CACHE_SIZE = 64
+    # Seconds a find_repositories() result is reused (while the base directory is unchanged);
+    # turning an existing directory into a repository does not touch the base directory
+    REPO_NAMES_TTL = 30
+    # Status states counted by summarize_repos (the /api/stats breakdown)
+    STATUS_COUNT_STATES = ('behind', 'ahead', 'up_to_date', 'diverged', 'no_remote', 'error')
+    
+    def __init__(self, base_path: str = "/git", fetch_rate_limiter=None, max_workers: Optional[int] = None,
+                 executor: Optional[ThreadPoolExecutor] = None):
         """Initialize scanner with base path to scan.
         
         fetch_rate_limiter: optional FetchRateLimiter — every remote fetch waits for a slot
         so concurrent scans stay accurate while pacing network traffic.
+        max_workers: default number of threads used to scan repositories concurrently
+        (None = min(8, 4 x CPU count)).
+        executor: optional long-lived thread pool shared across calls; concurrent work runs
+        on it (bounded by its size) instead of a pool created and torn down per call.
         """
         self.base_path = Path(base_path)
         self._fetch_rate_limiter = fetch_rate_limiter
+        self.max_workers = max_workers or min(self.DEFAULT_MAX_WORKERS, (os.cpu_count() or 1) * 4)
+        self.executor = executor
+        # repo path -> (refs/config fingerprint, branches/remote/last commit read under it)
+        self._local_info_cache: Dict[str, Tuple[Tuple, Dict]] = {}
+        # repo path -> (Repo, lock held while a call is using that handle)
+        self._repo_handles: "OrderedDict[str, Tuple[Repo, threading.Lock]]" = OrderedDict()
+        self._repo_handles_lock = threading.Lock()
+        # (base dir mtime, monotonic expiry, names) from the last find_repositories() walk
+        self._repo_names_cache: Optional[Tuple[int, float, List[str]]] = None
+        # Set while a background rescan of all repositories is running
+        self._refreshing = False
+        self._refresh_lock = threading.Lock()
     
-    def find_repositories(self) -> List[str]:
-        """Find all git repositories in the base path."""
+    @contextmanager
+    def _open_repo(self, repo_path: Path) -> Iterator[Repo]:
+        """Yield a Repo for repo_path, reusing the handle from earlier calls.
+        
+        Opening a repository resolves its git dir and reads its config, so handles are
+        kept in a small LRU (e.g. a repo's info followed by its history share one).
+        A Repo is not safe to share between threads, so each handle is used by one call
+        at a time. After each use the handle is closed, which stops GitPython's cat-file
+        helper processes and releases mapped pack windows; a closed Repo reopens them
+        lazily, so a scan over many repos doesn't accumulate them and a re-cloned
+        repository is never read through a stale helper.
+        """
+        key = str(repo_path)
+        with self._repo_handles_lock:
+            entry = self._repo_handles.get(key)
+            if entry is not None:
+                self._repo_handles.move_to_end(key)
+        if entry is None:
+            new_entry = (Repo(key), threading.Lock())
+            with self._repo_handles_lock:
+                entry = self._repo_handles.setdefault(key, new_entry)
+                while len(self._repo_handles) > self.REPO_HANDLE_CACHE_SIZE:
+                    self._repo_handles.popitem(last=False)
+        
+        repo, lock = entry
+        with lock:
+            try:
+                yield repo
+            except Exception:
+                # The repository may have been removed or replaced on disk
+                with self._repo_handles_lock:
+                    if self._repo_handles.get(key) is entry:
+                        del self._repo_handles[key]
+                raise
+            finally:
+                repo.close()
+    
+    def find_repositories(self, force_refresh: bool = False) -> List[str]:
+        """Find all git repositories in the base path.
+        
+        The result is reused for up to REPO_NAMES_TTL seconds while the base directory's
+        mtime is unchanged (adding, removing or renaming a directory changes it).
+        
+        Args:
+            force_refresh: If True, walk the base path even if a recent result is cached
+        """
+        try:
+            base_mtime = os.stat(self.base_path).st_mtime_ns
+        except OSError:
+            return []
+        cached = self._repo_names_cache
+        if cached and not force_refresh and cached[0] == base_mtime and time.monotonic() < cached[1]:
+            return list(cached[2])
+        
+        repos = self._scan_repository_names()
+        self._repo_names_cache = (base_mtime, time.monotonic() + self.REPO_NAMES_TTL, repos)
+        return list(repos)
+    
+    def clear_repo_names_cache(self):
+        """Forget the cached find_repositories() result, so the next call walks the base path."""
+        self._repo_names_cache = None
+    
+    def _scan_repository_names(self) -> List[str]:
+        """List the base path's subdirectories that contain a .git entry, sorted."""
         repos = []
-        if not self.base_path.exists():
+        try:
+            entries = os.scandir(self.base_path)
+        except (FileNotFoundError, NotADirectoryError):
             return repos
         
-        for item in self.base_path.iterdir():
-            if item.is_dir() and (item / ".git").exists():
-                repos.append(item.name)
+        # scandir's is_dir() uses the directory entry's type, so only the .git probe stats
+        with entries:
+            dirs = [entry for entry in entries if entry.is_dir()]
+        
+        sample, rest = dirs[:self.PROBE_SAMPLE], dirs[self.PROBE_SAMPLE:]
+        started = time.monotonic()
+        repos = [entry.name for entry in sample if has_git_dir(entry.path)]
+        slow = sample and (time.monotonic() - started) / len(sample) > self.SLOW_PROBE_SECONDS
+        
+        if rest and slow:
+            # Overlap the round trips instead of waiting on each probe in turn
+            found = self._pool_map(has_git_dir, [entry.path for entry in rest], self.max_workers)
+            repos.extend(entry.name for entry, is_repo in zip(rest, found) if is_repo)
+        else:
+            repos.extend(entry.name for entry in rest if has_git_dir(entry.path))
         
         return sorted(repos)
     
-    def get_repo_info(self, repo_name: str) -> Optional[Dict]:
-        """Get detailed information about a repository."""
+    def get_repo_info(self, repo_name: str, *, include_branches: bool = True,
+                      branch_limit: Optional[int] = None, check_dirty: bool = True) -> Optional[Dict]:
+        """Get detailed information about a repository.
+        
+        Args:
+            repo_name: Name of the repository
+            include_branches: If False, skip enumerating local/remote branches (returned empty)
+            branch_limit: Maximum number of local and of remote branches to return (None = all)
+            check_dirty: If False, skip the work-tree scan for uncommitted changes
+                (is_dirty is None); it stats every tracked file
+        """
         repo_path = self.base_path / repo_name
         
-        if not (repo_path / ".git").exists():
+        if not has_git_dir(repo_path):
             return None
         
         try:
-            repo = Repo(str(repo_path))
-            
-            # Get current branch
-            try:
-                current_branch = repo.active_branch.name
-            except TypeError:
-                # Detached HEAD state
-                current_branch = repo.head.commit.hexsha[:7]
-            
-            # Get all branches
-            local_branches = [branch.name for branch in repo.branches]
-            remote_branches = []
-            if repo.remotes:
-                for remote in repo.remotes:
-                    for branch in remote.refs:
-                        remote_branches.append(f"{remote.name}/{branch.name.split('/')[-1]}")
-            
-            # Get remote URL
-            remote_url = None
-            if repo.remotes:
-                try:
-                    remote_url = repo.remotes.origin.url
-                except Exception:
-                    remote_url = repo.remotes[0].url if repo.remotes else None
-            
-            # Get last commit info
-            last_commit = None
-            if repo.head.is_valid():
-                commit = repo.head.commit
-                last_commit = {
-                    "hash": commit.hexsha[:7],
-                    "message": commit.message.split('\n')[0],
-                    "author": commit.author.name,
-                    "date": commit.committed_datetime.isoformat()
+            with self._open_repo(repo_path) as repo:
+                # Get current branch from .git/HEAD: "ref: refs/heads/<name>", or a raw
+                # sha when detached (shown abbreviated)
+                with open(os.path.join(repo.git_dir, "HEAD"), "rb") as f:
+                    head = f.read().strip()
+                if head.startswith(b"ref: refs/heads/"):
+                    current_branch = head[16:].decode()
+                else:
+                    current_branch = head[:7].decode()
+                
+                # Check status (behind/ahead/up-to-date); this fetches, so read refs afterwards
+                status = self._get_repo_status(repo, current_branch)
+                
+                # Branches, remote URL and last commit (reused while refs/config are unchanged)
+                local_info = self._get_local_info(repo, repo_path, include_branches)
+                remote_url = local_info["remote_url"]
+                if include_branches:
+                    local_branches = local_info["local_branches"][:branch_limit]
+                    remote_branches = local_info["remote_branches"][:branch_limit]
+                else:
+                    local_branches, remote_branches = [], []
+                
+                return {
+                    "name": repo_name,
+                    "path": str(repo_path),
+                    "current_branch": current_branch,
+                    "local_branches": local_branches,
+                    "remote_branches": remote_branches,
+                    "remote_url": remote_url,
+                    "remote_web_url": remote_url_to_web(remote_url),
+                    "last_commit": dict(local_info["last_commit"]) if local_info["last_commit"] else None,
+                    "status": status,
+                    "is_dirty": self._is_dirty(repo) if check_dirty else None,
+                    "has_remote": local_info["has_remote"],
+                    "tracking_branch": status.get("compared_to_ref"),
+                    "remote_synced_at": status.get("remote_synced_at"),
                 }
-            
-            # Check status (behind/ahead/up-to-date)
-            status = self._get_repo_status(repo, current_branch)
-            
-            return {
-                "name": repo_name,
-                "path": str(repo_path),
-                "current_branch": current_branch,
-                "local_branches": local_branches,
-                "remote_branches": remote_branches,
-                "remote_url": remote_url,
-                "remote_web_url": remote_url_to_web(remote_url),
-                "last_commit": last_commit,
-                "status": status,
-                "is_dirty": repo.is_dirty(index=True, working_tree=True, untracked_files=True),
-                "has_remote": len(repo.remotes) > 0,
-                "tracking_branch": status.get("compared_to_ref"),
-                "remote_synced_at": status.get("remote_synced_at"),
-            }
         except InvalidGitRepositoryError:
             return None
         except Exception as e:
@@ -104,6 +209,172 @@ class GitScanner:
                 "error": str(e)
             }
     
+    @staticmethod
+    def _is_dirty(repo: Repo) -> bool:
+        """True if the index or work tree has changes or there are untracked files.
+        
+        One ``git status`` walk instead of ``Repo.is_dirty``'s separate staged, unstaged
+        and untracked-file commands.
+        """
+        return bool(repo.git.status('--porcelain', '--untracked-files=normal', '--no-renames'))
+    
+    def _get_local_info(self, repo: Repo, repo_path: Path, include_branches: bool = True) -> Dict:
+        """Return branches, remote URL and last commit, re-reading them only on change.
+        
+        Results are cached per repository under a fingerprint of HEAD, the checked-out
+        branch's ref, config, packed-refs and the refs/ directories. Ref updates are
+        written by renaming a lock file into place, so they change those files or the
+        containing directory's mtime. Branch lists are None in entries read with
+        include_branches=False.
+        """
+        path_key = str(repo_path)
+        fingerprint = self._local_state_key(repo_path)
+        if fingerprint is not None:
+            cached = self._local_info_cache.get(path_key)
+            if cached is not None and cached[0] == fingerprint:
+                if cached[1]["local_branches"] is not None or not include_branches:
+                    return cached[1]
+        
+        info = self._read_local_info(repo, include_branches)
+        if fingerprint is not None:
+            self._local_info_cache[path_key] = (fingerprint, info)
+        else:
+            self._local_info_cache.pop(path_key, None)
+        return info
+    
+    @staticmethod
+    def _local_state_key(repo_path: Path) -> Optional[Tuple]:
+        """Cheap fingerprint of a repository's refs and config (None if unavailable)."""
+        git_dir = os.path.join(repo_path, ".git")
+        try:
+            with open(os.path.join(git_dir, "HEAD"), "rb") as f:
+                head = f.read()
+            key = [head]
+            if head.startswith(b"ref: "):
+                try:
+                    with open(os.path.join(git_dir, head[5:].strip().decode()), "rb") as f:
+                        key.append(f.read())
+                except FileNotFoundError:
+                    # Packed (covered by packed-refs below) or no commits yet
+                    key.append(None)
+            for name in ("config", "packed-refs"):
+                try:
+                    key.append(os.stat(os.path.join(git_dir, name)).st_mtime_ns)
+                except FileNotFoundError:
+                    key.append(None)
+            for dirpath, _, _ in os.walk(os.path.join(git_dir, "refs")):
+                key.append((dirpath, os.stat(dirpath).st_mtime_ns))
+        except (OSError, UnicodeDecodeError):
+            # e.g. .git is a file (worktree/submodule) — don't cache
+            return None
+        return tuple(key)
+    
+    def _read_local_info(self, repo: Repo, include_branches: bool = True) -> Dict:
+        """Read branches (unless include_branches is False), remote URL and last commit."""
+        # Remote name -> URL, from a single parse of the repository config
+        remote_urls = self._read_remote_urls(repo)
+        
+        local_branches = remote_branches = None
+        if include_branches:
+            # Get all branches in one pass over the refs instead of one listing per remote
+            remote_names = remote_urls.keys()
+            local_branches = []
+            remote_branches = []
+            for path in self._read_branch_refs(repo.common_dir):
+                if path.startswith("refs/heads/"):
+                    local_branches.append(path[11:])
+                elif path.startswith("refs/remotes/"):
+                    remote_name, _, branch = path[13:].partition("/")
+                    if remote_name in remote_names:
+                        # Last path component only, e.g. origin/feature/x -> origin/x
+                        remote_branches.append(f"{remote_name}/{branch.rpartition('/')[2]}")
+        
+        # Get remote URL (origin, else the first configured remote)
+        remote_url = remote_urls.get("origin") or next(iter(remote_urls.values()), None)
+        
+        return {
+            "local_branches": local_branches,
+            "remote_branches": remote_branches,
+            "remote_url": remote_url,
+            # Get last commit info
+            "last_commit": self._get_last_commit(repo),
+            "has_remote": len(remote_urls) > 0,
+        }
+    
+    @staticmethod
+    def _read_remote_urls(repo: Repo) -> Dict[str, Optional[str]]:
+        """Configured remotes (in config file order) mapped to their URL, or None if unset."""
+        config = repo.config_reader("repository")
+        urls = {}
+        for section in config.sections():
+            if not section.startswith('remote "'):
+                continue
+            try:
+                urls[section[8:-1]] = config.get_value(section, "url")
+            except (NoSectionError, NoOptionError):
+                urls[section[8:-1]] = None
+        return urls
+    
+    @staticmethod
+    def _read_branch_refs(git_dir: str) -> List[str]:
+        """Sorted refs/heads/* and refs/remotes/* names, read straight from the ref store.
+        
+        packed-refs is read in one go and split with bytes methods, then loose ref files
+        are added from an os.scandir walk; no ref objects are built.
+        """
+        prefixes = (b"refs/heads/", b"refs/remotes/")
+        names = set()
+        try:
+            with open(os.path.join(git_dir, "packed-refs"), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        for line in data.splitlines():
+            # "<sha> <refname>"; skip the header and peeled-tag ("^<sha>") lines
+            if line[:1] in (b"#", b"^"):
+                continue
+            name = line.partition(b" ")[2]
+            if name.startswith(prefixes):
+                names.add(name.decode("utf-8", "replace"))
+        
+        stack = [os.path.join(git_dir, "refs", "heads"), os.path.join(git_dir, "refs", "remotes")]
+        refs_root_len = len(git_dir) + 1
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif not entry.name.endswith(".lock"):
+                        names.add(entry.path[refs_root_len:].replace(os.sep, "/"))
+        return sorted(names)
+    
+    def _get_last_commit(self, repo: Repo) -> Optional[Dict]:
+        """Read the HEAD commit's summary with a single ``git log`` call.
+        
+        Going through ``repo.head.commit`` makes GitPython start its persistent
+        ``cat-file`` helper processes for every repository opened, just to parse one
+        commit object.
+        
+        Returns:
+            Commit summary dictionary, or None if HEAD has no commit yet
+        """
+        try:
+            out = repo.git.log('-1', '--format=%H%x00%an%x00%cI%x00%B', strip_newline_in_stdout=False)
+        except git.GitCommandError:
+            # Unborn branch (no commits)
+            return None
+        hexsha, author, date, message = out.split('\x00', 3)
+        return {
+            "hash": hexsha[:7],
+            "message": message.split('\n')[0],
+            "author": author,
+            "date": date
+        }
+    
     def _get_repo_status(self, repo: Repo, branch_name: str) -> Dict:
         """Determine if repository is behind/ahead/up-to-date."""
         status = {
@@ -128,10 +399,9 @@ class GitScanner:
                 if self._fetch_rate_limiter:
                     self._fetch_rate_limiter.acquire(timeout=600.0)
                 remote_name = "origin"
-                if remote_name in repo.remotes:
-                    repo.remotes[remote_name].fetch()
-                elif len(repo.remotes) > 0:
-                    repo.remotes[0].fetch()
+                if remote_name not in repo.remotes:
+                    remote_name = repo.remotes[0].name
+                repo.git(**FETCH_GIT_OPTIONS).fetch(remote_name)
                 fetch_ok = True
             except Exception:
                 # If fetch fails, we'll still try to check status with existing refs
@@ -140,41 +410,38 @@ class GitScanner:
             if fetch_ok:
                 status["remote_synced_at"] = datetime.now(timezone.utc).isoformat()
             
-            # Try to find remote tracking branch
+            # Try to find remote tracking branch: main/master first, then the current
+            # branch. Resolved straight from the ref files (loose or packed) rather
+            # than building GitPython's whole ref list for every candidate.
             remote_name = "origin"
-            main_branches = ["main", "master"]
+            candidates = ["main", "master", branch_name]
             
-            tracking_branch = None
-            compared_to_ref = None
-            for main_branch in main_branches:
+            remote_sha = None
+            for candidate in candidates:
                 try:
-                    tracking_branch = repo.refs[f"{remote_name}/{main_branch}"]
-                    compared_to_ref = f"{remote_name}/{main_branch}"
-                    break
-                except (IndexError, AttributeError):
+                    remote_sha = git.SymbolicReference.dereference_recursive(
+                        repo, f"refs/remotes/{remote_name}/{candidate}"
+                    )
+                except ValueError:
                     continue
+                status["compared_to_ref"] = f"{remote_name}/{candidate}"
+                break
             
-            # If no main/master, try current branch
-            if not tracking_branch:
-                try:
-                    tracking_branch = repo.refs[f"{remote_name}/{branch_name}"]
-                    compared_to_ref = f"{remote_name}/{branch_name}"
-                except (IndexError, AttributeError):
-                    status["state"] = "no_tracking"
-                    return status
-            
-            status["compared_to_ref"] = compared_to_ref
-            
-            # Compare commits
-            local_commit = repo.head.commit
-            remote_commit = tracking_branch.commit
+            if remote_sha is None:
+                status["state"] = "no_tracking"
+                return status
             
-            # Count commits ahead/behind
-            commits_ahead = list(repo.iter_commits(f"{remote_commit.hexsha}..{local_commit.hexsha}"))
-            commits_behind = list(repo.iter_commits(f"{local_commit.hexsha}..{remote_commit.hexsha}"))
+            # Compare commits (resolved from the ref files; no object lookups)
+            local_sha = git.SymbolicReference.dereference_recursive(repo, "HEAD")
             
-            status["ahead"] = len(commits_ahead)
-            status["behind"] = len(commits_behind)
+            # Same commit is the common case: up to date without running git at all
+            if local_sha != remote_sha:
+                # Count commits ahead/behind in one walk of the symmetric difference:
+                # output is "<only in local>\t<only in remote>"
+                counts = repo.git.rev_list(
+                    '--left-right', '--count', f"{local_sha}...{remote_sha}"
+                ).split()
+                status["ahead"], status["behind"] = int(counts[0]), int(counts[1])
             
             if status["behind"] > 0 and status["ahead"] > 0:
                 status["state"] = "diverged"
@@ -185,102 +452,295 @@ class GitScanner:
                 status["state"] = "ahead"
             else:
                 status["state"] = "up_to_date"
-                
+        
         except Exception as e:
             status["state"] = "error"
             status["error"] = str(e)
         
         return status
     
-    def get_commit_history(self, repo_name: str, limit: int = 20) -> List[Dict]:
-        """Get commit history for a repository."""
-        repo_path = self.base_path / repo_name
-        
-        if not (repo_path / ".git").exists():
-            return []
+    def get_commit_history(self, repo_name: str, limit: int = 20, include_stats: bool = False) -> List[Dict]:
+        """Get commit history for a repository.
         
+        Args:
+            repo_name: Name of the repository
+            limit: Maximum number of commits to return
+            include_stats: If True, add per-commit line stats (computed with one ``git log --numstat``)
+        """
         try:
-            repo = Repo(str(repo_path))
-            commits = []
+            commits = list(self.iter_commit_history(repo_name, limit))
             
-            for commit in repo.iter_commits(max_count=limit):
-                commits.append({
-                    "hash": commit.hexsha[:7],
-                    "full_hash": commit.hexsha,
-                    "message": commit.message.split('\n')[0],
-                    "author": commit.author.name,
-                    "email": commit.author.email,
-                    "date": commit.committed_datetime.isoformat(),
-                    "stats": {
-                        "total": commit.stats.total.get('lines', 0) if commit.stats.total else 0,
-                        "insertions": commit.stats.total.get('insertions', 0) if commit.stats.total else 0,
-                        "deletions": commit.stats.total.get('deletions', 0) if commit.stats.total else 0
-                    } if hasattr(commit, 'stats') else {}
-                })
+            if include_stats and commits:
+                stats = self._get_commit_stats(Git(str(self.base_path / repo_name)), limit)
+                for commit in commits:
+                    commit["stats"] = stats.get(commit["full_hash"], {"total": 0, "insertions": 0, "deletions": 0})
             
             return commits
         except Exception as e:
             print(f"Error getting commit history for {repo_name}: {e}")
             return []
     
+    def iter_commit_history(self, repo_name: str, limit: int = 20) -> Iterator[Dict]:
+        """Yield recent commits (newest first), streamed from a single ``git log``.
+        
+        Entries are parsed as git writes them, and the git process is stopped as soon as
+        the caller stops iterating.
+        
+        Raises:
+            GitCommandError: If git log fails (e.g. the repository has no commits yet)
+        """
+        repo_path = self.base_path / repo_name
+        if not has_git_dir(repo_path):
+            return
+        
+        # One NUL-terminated record per commit, fields separated by \x1f
+        handle = Git(str(repo_path)).log(
+            '-z', '--format=%H%x1f%an%x1f%ae%x1f%cI%x1f%B', f'-n{limit}', as_process=True
+        )
+        proc = handle.proc
+        try:
+            pending = b""
+            while True:
+                chunk = proc.stdout.read1(1 << 16)
+                if not chunk:
+                    break
+                *records, pending = (pending + chunk).split(b"\x00")
+                for record in records:
+                    yield self._parse_log_record(record)
+            if pending.strip():
+                yield self._parse_log_record(pending)
+            
+            stderr = proc.stderr.read()
+            if proc.wait() != 0:
+                raise git.GitCommandError(['git', 'log'], proc.returncode, stderr)
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+            proc.stderr.close()
+    
+    @staticmethod
+    def _parse_log_record(record: bytes) -> Dict:
+        """Turn one ``git log`` record from iter_commit_history into a commit dict."""
+        hexsha, author, email, date, message = record.decode("utf-8", "replace").split("\x1f", 4)
+        return {
+            "hash": hexsha[:7],
+            "full_hash": hexsha,
+            "message": message.split('\n')[0],
+            "author": author,
+            "email": email,
+            "date": date,
+        }
+    
+    def _map_repos(self, func, repo_names: List[str], parallel_workers: Optional[int] = None) -> List:
+        """Apply func to each repo name, concurrently when more than one worker is allowed.
+        
+        Results are returned in the order of repo_names. An exception raised for one repo
+        is returned in its slot as {"name": ..., "error": ...} instead of aborting the rest.
+        
+        Args:
+            func: Callable taking a repository name
+            repo_names: Repository names to process
+            parallel_workers: Number of worker threads (None = scanner default, 1 = sequential)
+        """
+        def run(repo_name):
+            try:
+                return func(repo_name)
+            except Exception as e:
+                return {
+                    "name": repo_name,
+                    "error": str(e)
+                }
+        
+        workers = min(parallel_workers or self.max_workers, len(repo_names))
+        if workers <= 1:
+            return [run(repo_name) for repo_name in repo_names]
+        return self._pool_map(run, repo_names, workers)
+    
+    def _pool_map(self, func, items: List, workers: int) -> List:
+        """executor.map over items on the shared executor, or on a pool of ``workers`` threads.
+        
+        Tasks must not submit to the pool themselves: with a shared pool that could wait on
+        work queued behind them.
+        """
+        if self.executor is not None:
+            return list(self.executor.map(func, items))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(func, items))
+    
+    def _get_commit_stats(self, git_cmd: Git, limit: int) -> Dict[str, Dict]:
+        """Line stats for the last ``limit`` commits from a single ``git log --numstat``.
+        
+        Merges are diffed against their first parent and renames are not detected,
+        matching GitPython's ``Commit.stats``.
+        
+        Returns:
+            Dictionary mapping full commit hash to {"total", "insertions", "deletions"}
+        """
+        out = git_cmd.log('--numstat', '--no-renames', '--diff-merges=first-parent',
+                          '--format=__C__%H', f'-n{limit}')
+        stats = {}
+        current = None
+        for line in out.splitlines():
+            if line.startswith('__C__'):
+                current = stats[line[5:]] = {"total": 0, "insertions": 0, "deletions": 0}
+                continue
+            parts = line.split('\t', 2)
+            if current is None or len(parts) < 3:
+                continue
+            # Binary files show "-" for both counts
+            insertions = int(parts[0]) if parts[0].isdigit() else 0
+            deletions = int(parts[1]) if parts[1].isdigit() else 0
+            current["insertions"] += insertions
+            current["deletions"] += deletions
+            current["total"] += insertions + deletions
+        return stats
+    
     def scan_all_repos(self, force_refresh: bool = False, cache_manager=None, 
                       batch_size: int = None, parallel_workers: int = None) -> List[Dict]:
         """Scan all repositories and return their info.
         
+        Repositories are scanned concurrently; results keep the sorted repository order.
+        
         Args:
             force_refresh: If True, bypass cache and force fresh scan
             cache_manager: Optional CacheManager instance for caching
-            batch_size: Number of repos to process per batch (None = process all at once)
-            parallel_workers: Number of parallel workers (None = sequential)
-            
+            batch_size: Unused; kept for API compatibility (the whole set is scanned at once)
+            parallel_workers: Number of parallel workers (None = scanner default, 1 = sequential)
+        
         Returns:
             List of repository information dictionaries
         """
-        # Check cache first if available and not forcing refresh
+        # Check cache first if available and not forcing refresh. Past its TTL the
+        # previous scan is still returned while a background rescan replaces it.
         if cache_manager and not force_refresh:
-            cached_data = cache_manager.get('all')
+            cached_data, is_stale = cache_manager.get_stale('all')
             if cached_data is not None:
+                if is_stale:
+                    self._refresh_all_in_background(cache_manager, parallel_workers)
                 return cached_data
         
         # Perform fresh scan
-        repos = self.find_repositories()
-        repo_info = []
+        repos = self.find_repositories(force_refresh)
+        repo_info = [info for info in self._map_repos(self.get_repo_info, repos, parallel_workers) if info]
         
-        # If batch_size or parallel_workers specified, use parallel processing
-        if batch_size and parallel_workers and parallel_workers > 1:
-            # Process in batches with parallel workers
-            with ThreadPoolExecutor(max_workers=parallel_workers) as executor:
-                # Submit all tasks
-                future_to_repo = {
-                    executor.submit(self.get_repo_info, repo_name): repo_name 
-                    for repo_name in repos
+        # Store in cache if cache manager available
+        if cache_manager:
+            self.cache_scan(cache_manager, repo_info)
+        
+        return repo_info
+    
+    def _refresh_all_in_background(self, cache_manager, parallel_workers: Optional[int] = None):
+        """Rescan every repository into the cache on a background thread (one at a time).
+        
+        Runs on its own thread rather than the shared executor, since the scan itself
+        submits its per-repo work to that pool.
+        """
+        with self._refresh_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        
+        def refresh():
+            try:
+                self.scan_all_repos(force_refresh=True, cache_manager=cache_manager,
+                                    parallel_workers=parallel_workers)
+            except Exception as e:
+                print(f"Error refreshing repository cache: {e}")
+            finally:
+                self._refreshing = False
+        
+        threading.Thread(target=refresh, name="repo-cache-refresh", daemon=True).start()
+    
+    def iter_scan_repos(self, force_refresh: bool = False, cache_manager=None,
+                        parallel_workers: int = None) -> Iterator[Dict]:
+        """Like scan_all_repos, but yield each repository's info as soon as it is ready.
+        
+        A fresh scan yields in completion order (not sorted) and is cached as a full scan
+        once every repository has been yielded. Closing the iterator early cancels the
+        scans that have not started yet.
+        
+        Args:
+            force_refresh: If True, bypass cache and force fresh scan
+            cache_manager: Optional CacheManager instance for caching
+            parallel_workers: Number of parallel workers (None = scanner default, 1 = sequential)
+        
+        Yields:
+            Repository information dictionaries ({"name", "error"} for a repo that failed)
+        """
+        if cache_manager and not force_refresh:
+            cached_data, is_stale = cache_manager.get_stale('all')
+            if cached_data is not None:
+                if is_stale:
+                    self._refresh_all_in_background(cache_manager, parallel_workers)
+                yield from cached_data
+                return
+        
+        def run(repo_name):
+            try:
+                return repo_name, self.get_repo_info(repo_name)
+            except Exception as e:
+                return repo_name, {
+                    "name": repo_name,
+                    "error": str(e)
                 }
-                
-                # Collect results as they complete
-                for future in as_completed(future_to_repo):
-                    repo_name = future_to_repo[future]
-                    try:
-                        info = future.result()
-                        if info:
-                            repo_info.append(info)
-                    except Exception as e:
-                        # Handle errors gracefully
-                        repo_info.append({
-                            "name": repo_name,
-                            "error": str(e)
-                        })
-        else:
-            # Sequential processing (original behavior)
+        
+        repos = self.find_repositories(force_refresh)
+        workers = min(parallel_workers or self.max_workers, len(repos))
+        scanned: Dict[str, Dict] = {}
+        if workers <= 1:
             for repo_name in repos:
-                info = self.get_repo_info(repo_name)
+                _, info = run(repo_name)
                 if info:
-                    repo_info.append(info)
+                    scanned[repo_name] = info
+                    yield info
+        else:
+            own_executor = None
+            executor = self.executor
+            if executor is None:
+                executor = own_executor = ThreadPoolExecutor(max_workers=workers)
+            futures = [executor.submit(run, repo_name) for repo_name in repos]
+            try:
+                for future in as_completed(futures):
+                    repo_name, info = future.result()
+                    if info:
+                        scanned[repo_name] = info
+                        yield info
+            finally:
+                for future in futures:
+                    future.cancel()
+                if own_executor:
+                    own_executor.shutdown(wait=False)
         
-        # Store in cache if cache manager available
         if cache_manager:
-            cache_manager.set('all', repo_info)
+            self.cache_scan(cache_manager, [scanned[name] for name in repos if name in scanned])
+    
+    @classmethod
+    def summarize_repos(cls, repos: List[Dict]) -> Dict:
+        """Count repositories per status state and with uncommitted changes.
         
-        return repo_info
+        Returns:
+            Dictionary with "status_counts" (state -> count) and "repos_with_changes"
+        """
+        status_counts = dict.fromkeys(cls.STATUS_COUNT_STATES, 0)
+        repos_with_changes = 0
+        for repo in repos:
+            state = repo.get('status', {}).get('state', 'unknown')
+            if state in status_counts:
+                status_counts[state] += 1
+            if repo.get('is_dirty', False):
+                repos_with_changes += 1
+        return {"status_counts": status_counts, "repos_with_changes": repos_with_changes}
+    
+    def cache_scan(self, cache_manager, repo_info: List[Dict]):
+        """Cache the full scan under 'all' with its summary under 'all_summary'.
+        
+        The summary keeps a reference to the list it was computed from, so readers can
+        check it still matches what 'all' holds.
+        """
+        cache_manager.set('all', repo_info)
+        cache_manager.set('all_summary', {"repos": repo_info, **self.summarize_repos(repo_info)})
     
     def scan_repos_batch(self, repo_names: List[str], force_refresh: bool = False, 
                         cache_manager=None, parallel_workers: int = None) -> List[Dict]:
@@ -290,8 +750,8 @@ class GitScanner:
             repo_names: List of repository names to scan
             force_refresh: If True, bypass cache and force fresh scan
             cache_manager: Optional CacheManager instance for caching
-            parallel_workers: Number of parallel workers for processing (None = sequential)
-            
+            parallel_workers: Number of parallel workers (None = scanner default, 1 = sequential)
+        
         Returns:
             List of repository information dictionaries
         """
@@ -313,37 +773,13 @@ class GitScanner:
         if not repos_to_scan:
             return repo_info
         
-        # Process remaining repos in parallel if workers specified
-        if parallel_workers and parallel_workers > 1 and len(repos_to_scan) > 1:
-            with ThreadPoolExecutor(max_workers=parallel_workers) as executor:
-                future_to_repo = {
-                    executor.submit(self.get_repo_info, repo_name): repo_name 
-                    for repo_name in repos_to_scan
-                }
-                
-                for future in as_completed(future_to_repo):
-                    repo_name = future_to_repo[future]
-                    try:
-                        info = future.result()
-                        if info:
-                            repo_info.append(info)
-                            # Cache individual repo if cache manager available
-                            if cache_manager:
-                                cache_manager.set(repo_name, info)
-                    except Exception as e:
-                        repo_info.append({
-                            "name": repo_name,
-                            "error": str(e)
-                        })
-        else:
-            # Sequential processing
-            for repo_name in repos_to_scan:
-                info = self.get_repo_info(repo_name)
-                if info:
-                    repo_info.append(info)
-                    # Cache individual repo if cache manager available
-                    if cache_manager:
-                        cache_manager.set(repo_name, info)
+        # Process remaining repos (concurrently unless parallel_workers == 1)
+        for repo_name, info in zip(repos_to_scan,
+                                   self._map_repos(self.get_repo_info, repos_to_scan, parallel_workers)):
+            if info:
+                repo_info.append(info)
+                # Cache individual repo if cache manager available
+                if cache_manager:
+                    cache_manager.set(repo_name, info)
         
         return repo_info
-
@@ -1,6 +1,21 @@
-"""Helpers for remote URLs and display."""
+"""Helpers for remote URLs, display and repository detection."""
+import os
 import re
-from typing import Optional
+from typing import Optional, Union
+
+# Git options for fetches: update the commit-graph file whenever a fetch brings in a
+# pack, so later rev-list/log walks (ahead/behind counts, history) read parents and
+# generation numbers from it instead of inflating commit objects
+FETCH_GIT_OPTIONS = {"c": "fetch.writeCommitGraph=true"}
+
+
+def has_git_dir(repo_dir: Union[str, os.PathLike]) -> bool:
+    """True if repo_dir contains a .git entry (directory, or file for worktrees/submodules).
+
+    Uses access(F_OK), which only resolves the path, rather than a full stat() whose
+    metadata would be thrown away.
+    """
+    return os.access(os.path.join(repo_dir, ".git"), os.F_OK)
 
 
 def remote_url_to_web(url: Optional[str]) -> Optional[str]:
@@ -0,0 +1,78 @@
+"""Reading and writing the JSON config files kept in the data directory."""
+import mmap
+import os
+import tempfile
+from typing import Any
+
+import orjson
+
+# Files at least this large are parsed from a memory map instead of being read into a bytes copy
+MMAP_THRESHOLD = 1024 * 1024
+
+# File contents only; the metadata is brought along by the rename (not available on macOS/Windows)
+_datasync = getattr(os, 'fdatasync', os.fsync)
+
+# Directories already created by ensure_parent_dir (they are not removed while we run)
+_ready_dirs = set()
+
+
+def load_json_file(path: str) -> Any:
+    """Parse a JSON file with orjson.
+    
+    Args:
+        path: Path to the JSON file
+    
+    Returns:
+        The parsed document
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+            return orjson.loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+
+
+def ensure_parent_dir(path: str) -> None:
+    """Create the directory a file goes in, once per directory per process.
+    
+    Args:
+        path: File about to be written
+    """
+    directory = os.path.dirname(path)
+    if directory and directory not in _ready_dirs:
+        os.makedirs(directory, exist_ok=True)
+        _ready_dirs.add(directory)
+
+
+def safe_write(path: str, data: bytes) -> None:
+    """Replace a file's contents atomically: the file holds either the old or the new data.
+    
+    The directory is created if needed. The data goes to a fresh temporary file in the
+    same directory, is flushed to disk, and the temporary file is then renamed over the target.
+    
+    Args:
+        path: File to write
+        data: Complete new contents
+    """
+    ensure_parent_dir(path)
+    fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(path) or '.',
+                                     prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        # mkstemp creates the file 0600; keep the mode the config file had (or the usual 0644)
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        with os.fdopen(fd, 'wb') as f:
+            os.fchmod(f.fileno(), mode)
+            f.write(data)
+            f.flush()
+            _datasync(f.fileno())
+        os.replace(temp_file, path)
+    except BaseException:
+        try:
+            os.remove(temp_file)
+        except OSError:
+            pass
+        raise
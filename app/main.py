@@ -1,9 +1,11 @@
 """Flask application entry point."""
 import os
 from flask import Flask
+from flask_compress import Compress
 from app.services import init_services, APP_VERSION
 from app.routes import register_routes
 from app.auth import check_api_key, unauthorized_response
+from app.json_provider import OrjsonProvider
 
 # Parent of app/ (repo root)
 base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -21,7 +23,16 @@ app = Flask(
     template_folder=os.path.join(base_dir, 'templates'),
     static_folder=os.path.join(base_dir, 'static'),
 )
-app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
+app.json = OrjsonProvider(app)
+# Clients parse the JSON; skip the key sort (add ?pretty=1 for indented output)
+app.json.sort_keys = False
+# Compress JSON responses (repeated keys shrink well); small bodies are not worth it
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 1024
+app.config['COMPRESS_LEVEL'] = 4
+# Compressing a stream would buffer it whole (/api/repos/stream must flush per line)
+app.config['COMPRESS_STREAMS'] = False
+Compress(app)
 
 register_routes(app)
 
@@ -1,47 +1,256 @@
 """Repository grouping and tagging."""
-import json
+import atexit
+import functools
+import itertools
 import os
-from typing import List, Dict, Optional
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Set, Tuple
+
+import orjson
+
+from app.json_files import ensure_parent_dir, load_json_file, safe_write
+
+
+def _locked(method):
+    """Run a RepoGroups method while holding the instance lock."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class RepoGroups:
-    """Manages repository groups and tags."""
+    """Manages repository groups and tags.
+    
+    Changes are appended to a journal next to the config file ('<config_file>.jsonl')
+    instead of rewriting the whole file on every edit; the journal is folded back into
+    the config file once it reaches JOURNAL_COMPACT_LINES entries.
+    """
+    
+    JOURNAL_COMPACT_LINES = 1000
     
     def __init__(self, config_file: str = "/app/repo_groups.json"):
         """Initialize repository groups manager."""
         self.config_file = config_file
+        # Request threads share one instance: every public method runs under this lock, so
+        # the groups, the lookups derived from them and the journal always change together
+        self._lock = threading.RLock()
+        self.journal_file = config_file + '.jsonl'
+        self._journal_lines = 0
+        # Journal entries held back by an open batch(), None outside one (only touched
+        # under the lock, which the batch holds throughout)
+        self._pending: Optional[List[Dict]] = None
         self.groups = self._load_groups()
+        self._replay_journal()
+        # Lookups kept in step with every mutation: repo name -> ids of the groups holding
+        # it, and group name -> id (first group with that name, as a linear scan would find)
+        self._repo_to_groups: Dict[str, Set[str]] = {}
+        self._name_to_id: Dict[str, str] = {}
+        # Group id -> set of its repos, mirroring each group's 'repos' list for O(1) membership
+        self._group_repos: Dict[str, Set[str]] = {}
+        # Tag -> repos carrying it (tags with no repos are dropped)
+        self._tag_index: Dict[str, Set[str]] = {}
+        self._reindex()
+        # Default group name -> repo list it was last synced from; cleared on every save so
+        # a later edit to the groups is re-synced even for the same list
+        self._synced_from: Dict[str, List[Dict]] = {}
+        # Bumped on every save, so callers can tell whether groups/tags changed
+        self.revision = 0
+        # Fold what was replayed into the config file so the journal starts empty, and do
+        # the same at exit so the next start has nothing to replay
+        if self._journal_lines:
+            try:
+                self.flush()
+            except Exception:
+                # Already reported; the journal is still there and is replayed next time
+                pass
+        atexit.register(self.flush)
     
     def _load_groups(self) -> Dict:
-        """Load groups from config file."""
+        """Load groups from config file.
+        
+        The result always has 'groups' and 'tags', and every group a 'repos' list, so the
+        rest of the class can index them directly.
+        """
+        data = {}
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r') as f:
-                    return json.load(f)
+                data = load_json_file(self.config_file)
             except Exception:
-                return {"groups": {}, "tags": {}}
-        return {"groups": {}, "tags": {}}
+                data = {}
+        data.setdefault('groups', {})
+        data.setdefault('tags', {})
+        for group in data['groups'].values():
+            if not isinstance(group.get('repos'), list):
+                group['repos'] = []
+        return data
+    
+    def _replay_journal(self):
+        """Apply journaled changes that have not been compacted into the config file yet."""
+        if not os.path.exists(self.journal_file):
+            return
+        try:
+            with open(self.journal_file, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        # Torn last line from an interrupted write
+                        continue
+                    self._apply(entry)
+                    self._journal_lines += 1
+        except Exception as e:
+            print(f"Error replaying repo groups journal: {e}")
+    
+    def _apply(self, entry: Dict):
+        """Apply one journal entry to the in-memory groups.
+        
+        Every operation is idempotent, so replaying entries that already made it into
+        the config file (crash between compaction and journal removal) is harmless.
+        """
+        groups = self.groups['groups']
+        tags = self.groups['tags']
+        op = entry.get('op')
+        if op == 'set_group':
+            groups[entry['group']['id']] = entry['group']
+        elif op == 'delete_group':
+            groups.pop(entry['id'], None)
+        elif op == 'group_repos':
+            group = groups.get(entry['id'])
+            if group is not None:
+                repo_list = group['repos']
+                for repo_name in entry.get('add', []):
+                    if repo_name not in repo_list:
+                        repo_list.append(repo_name)
+                removed = set(entry.get('remove', []))
+                if removed:
+                    group['repos'] = [r for r in repo_list if r not in removed]
+        elif op == 'add_tag':
+            repo_tags = tags.setdefault(entry['repo'], [])
+            if entry['tag'] not in repo_tags:
+                repo_tags.append(entry['tag'])
+        elif op == 'remove_tag':
+            if entry['tag'] in tags.get(entry['repo'], []):
+                tags[entry['repo']].remove(entry['tag'])
+    
+    def _reindex(self):
+        """Rebuild the repo, group name and tag lookups from the loaded groups."""
+        self._repo_to_groups = {}
+        self._group_repos = {}
+        for group_id, group in self.groups['groups'].items():
+            self._index_repos(group_id, group['repos'])
+        self._reindex_names()
+        self._tag_index = {}
+        for repo_name, tags in self.groups['tags'].items():
+            # A few tags are typically shared by many repos: keep one copy of each string
+            tags[:] = [sys.intern(tag) for tag in tags]
+            for tag in tags:
+                self._tag_index.setdefault(tag, set()).add(repo_name)
+        # Group id -> position in creation order (the order of self.groups['groups'])
+        self._group_order = {group_id: i for i, group_id in enumerate(self.groups['groups'])}
+        self._group_seq = itertools.count(len(self._group_order))
+    
+    def _reindex_names(self):
+        """Rebuild the group name -> id lookup."""
+        self._name_to_id = {}
+        for group_id, group in self.groups['groups'].items():
+            self._name_to_id.setdefault(group.get('name'), group_id)
+    
+    def _index_repos(self, group_id: str, repo_names):
+        """Record that a group contains the given repositories."""
+        group_repos = self._group_repos.setdefault(group_id, set())
+        for repo_name in repo_names:
+            group_repos.add(repo_name)
+            self._repo_to_groups.setdefault(repo_name, set()).add(group_id)
+    
+    def _unindex_repos(self, group_id: str, repo_names):
+        """Record that a group no longer contains the given repositories."""
+        group_repos = self._group_repos.get(group_id, set())
+        for repo_name in repo_names:
+            group_repos.discard(repo_name)
+            group_ids = self._repo_to_groups.get(repo_name)
+            if group_ids is not None:
+                group_ids.discard(group_id)
+                if not group_ids:
+                    del self._repo_to_groups[repo_name]
+    
+    def _record(self, *entries: Dict):
+        """Persist changes that have already been applied in memory, in one write.
+        
+        Args:
+            entries: Journal entries describing the changes (see _apply)
+        """
+        self._synced_from.clear()
+        self.revision += 1
+        if self._pending is not None:
+            self._pending.extend(entries)
+            return
+        self._write_journal(entries)
+    
+    def _write_journal(self, entries: List[Dict]):
+        """Append entries to the journal, compacting instead once it is long enough."""
+        if self._journal_lines + len(entries) >= self.JOURNAL_COMPACT_LINES:
+            self._save_groups()
+            return
+        try:
+            ensure_parent_dir(self.journal_file)
+            with open(self.journal_file, 'ab') as f:
+                f.write(b''.join(orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE) for entry in entries))
+            self._journal_lines += len(entries)
+        except Exception as e:
+            print(f"Error writing repo groups journal: {e}")
+            raise
+    
+    @contextmanager
+    def batch(self):
+        """Coalesce the journal writes of every change made inside the block into one.
+        
+        Changes apply in memory immediately; they are persisted when the outermost
+        batch exits. The lock is held for the whole block, so other threads' changes
+        wait for it rather than landing in (or nesting into) this batch.
+        """
+        with self._lock:
+            if self._pending is not None:
+                # Nested batch in the same thread: the outer one writes
+                yield
+                return
+            self._pending = []
+            try:
+                yield
+            finally:
+                pending, self._pending = self._pending, None
+                if pending:
+                    self._write_journal(pending)
+    
+    @_locked
+    def flush(self):
+        """Compact the journal into the config file."""
+        if self._journal_lines:
+            self._save_groups()
     
     def _save_groups(self):
-        """Save groups to config file."""
+        """Save groups to config file and drop the journal it now covers."""
+        self._synced_from.clear()
+        self.revision += 1
         try:
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-            # Write to a temporary file first, then rename (atomic operation)
-            temp_file = self.config_file + '.tmp'
-            with open(temp_file, 'w') as f:
-                json.dump(self.groups, f, indent=2)
-            # Atomic rename
-            os.replace(temp_file, self.config_file)
+            # Atomic replace, then drop the journal entries the new file covers
+            safe_write(self.config_file, orjson.dumps(self.groups, option=orjson.OPT_INDENT_2))
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+            self._journal_lines = 0
         except Exception as e:
             print(f"Error saving repo groups: {e}")
             raise
     
+    @_locked
     def create_group(self, name: str, repos: List[str], color: Optional[str] = None) -> Dict:
         """Create a new repository group."""
-        import time
-        # Generate unique ID based on timestamp to avoid collisions
-        group_id = f"group_{int(time.time() * 1000)}"
+        # Random ids can't collide with groups created elsewhere (e.g. an edited config file)
+        group_id = f"group_{uuid.uuid4().hex[:16]}"
         group = {
             "id": group_id,
             "name": name,
@@ -49,206 +258,260 @@ class RepoGroups:
             "color": color or "#3B82F6"  # Default blue
         }
         
-        if 'groups' not in self.groups:
-            self.groups['groups'] = {}
         self.groups['groups'][group_id] = group
-        self._save_groups()
+        self._group_order[group_id] = next(self._group_seq)
+        self._index_repos(group_id, group['repos'])
+        self._name_to_id.setdefault(name, group_id)
+        self._record({"op": "set_group", "group": group})
         
         return group
     
+    @_locked
     def update_group(self, group_id: str, **kwargs) -> Optional[Dict]:
         """Update a group."""
-        if group_id not in self.groups.get('groups', {}):
+        group = self.groups['groups'].get(group_id)
+        if group is None:
             return None
         
-        self.groups['groups'][group_id].update(kwargs)
-        self._save_groups()
-        return self.groups['groups'][group_id]
+        self._unindex_repos(group_id, group['repos'])
+        group.update(kwargs)
+        if not isinstance(group.get('repos'), list):
+            group['repos'] = []
+        self._index_repos(group_id, group['repos'])
+        if 'name' in kwargs:
+            self._reindex_names()
+        self._record({"op": "set_group", "group": group})
+        return group
     
+    @_locked
     def delete_group(self, group_id: str) -> bool:
         """Delete a group."""
-        if group_id not in self.groups.get('groups', {}):
+        group = self.groups['groups'].pop(group_id, None)
+        if group is None:
             return False
         
-        del self.groups['groups'][group_id]
-        self._save_groups()
+        self._unindex_repos(group_id, group['repos'])
+        self._group_repos.pop(group_id, None)
+        self._group_order.pop(group_id, None)
+        if self._name_to_id.get(group.get('name')) == group_id:
+            self._reindex_names()
+        self._record({"op": "delete_group", "id": group_id})
         return True
     
+    @_locked
     def get_groups(self) -> List[Dict]:
         """Get all groups."""
-        return list(self.groups.get('groups', {}).values())
+        return list(self.groups['groups'].values())
     
+    @_locked
     def get_repo_groups(self, repo_name: str) -> List[str]:
         """Get groups that contain a repository."""
-        groups = []
-        for group in self.groups.get('groups', {}).values():
-            if repo_name in group.get('repos', []):
-                groups.append(group['name'])
-        return groups
+        # Same order as the groups themselves (creation order)
+        groups = self.groups['groups']
+        return [groups[group_id]['name']
+                for group_id in sorted(self._repo_to_groups.get(repo_name, ()), key=self._group_order.__getitem__)]
     
+    @_locked
+    def build_index(self) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+        """Map every repository to its groups and tags in one pass over the groups.
+        
+        Returns:
+            Tuple of ({repo_name: [group names]}, {repo_name: [tags]}), matching
+            get_repo_groups() and get_tags() for each repository
+        """
+        groups_idx: Dict[str, List[str]] = {}
+        for group in self.groups['groups'].values():
+            for repo_name in dict.fromkeys(group['repos']):
+                groups_idx.setdefault(repo_name, []).append(group['name'])
+        return groups_idx, dict(self.groups['tags'])
+    
+    @_locked
     def add_repo_to_group(self, group_id: str, repo_name: str) -> bool:
         """Add a repository to a group."""
-        if group_id not in self.groups.get('groups', {}):
+        group = self.groups['groups'].get(group_id)
+        if group is None:
             return False
         
-        group = self.groups['groups'][group_id]
-        if 'repos' not in group:
-            group['repos'] = []
-        
-        if repo_name not in group['repos']:
+        if repo_name not in self._group_repos.get(group_id, ()):
             group['repos'].append(repo_name)
-            self._save_groups()
+            self._index_repos(group_id, [repo_name])
+            self._record({"op": "group_repos", "id": group_id, "add": [repo_name]})
         
         return True
     
+    @_locked
     def remove_repo_from_group(self, group_id: str, repo_name: str) -> bool:
         """Remove a repository from a group."""
-        if group_id not in self.groups.get('groups', {}):
+        group = self.groups['groups'].get(group_id)
+        if group is None:
             return False
         
-        group = self.groups['groups'][group_id]
-        if repo_name in group.get('repos', []):
-            group['repos'].remove(repo_name)
-            self._save_groups()
+        if repo_name in self._group_repos.get(group_id, ()):
+            group['repos'] = [r for r in group['repos'] if r != repo_name]
+            self._unindex_repos(group_id, [repo_name])
+            self._record({"op": "group_repos", "id": group_id, "remove": [repo_name]})
         
         return True
     
+    @_locked
     def add_tag(self, repo_name: str, tag: str):
         """Add a tag to a repository."""
-        if 'tags' not in self.groups:
-            self.groups['tags'] = {}
-        if repo_name not in self.groups['tags']:
-            self.groups['tags'][repo_name] = []
-        if tag not in self.groups['tags'][repo_name]:
-            self.groups['tags'][repo_name].append(tag)
-            self._save_groups()
+        repo_tags = self.groups['tags'].setdefault(repo_name, [])
+        if tag not in repo_tags:
+            tag = sys.intern(tag)
+            repo_tags.append(tag)
+            self._tag_index.setdefault(tag, set()).add(repo_name)
+            self._record({"op": "add_tag", "repo": repo_name, "tag": tag})
     
+    @_locked
     def remove_tag(self, repo_name: str, tag: str):
         """Remove a tag from a repository."""
-        if repo_name in self.groups.get('tags', {}):
+        if repo_name in self.groups['tags']:
             if tag in self.groups['tags'][repo_name]:
                 self.groups['tags'][repo_name].remove(tag)
-                self._save_groups()
+                tagged = self._tag_index.get(tag)
+                if tagged is not None:
+                    tagged.discard(repo_name)
+                    if not tagged:
+                        del self._tag_index[tag]
+                self._record({"op": "remove_tag", "repo": repo_name, "tag": tag})
     
+    @_locked
     def get_tags(self, repo_name: str) -> List[str]:
         """Get tags for a repository."""
-        return self.groups.get('tags', {}).get(repo_name, [])
+        return list(self.groups['tags'].get(repo_name, ()))
     
+    @_locked
     def get_all_tags(self) -> List[str]:
         """Get all unique tags."""
-        all_tags = set()
-        for tags in self.groups.get('tags', {}).values():
-            all_tags.update(tags)
-        return sorted(list(all_tags))
+        return sorted(self._tag_index)
     
+    @_locked
     def get_or_create_default_behind_group(self) -> str:
         """Get or create the default 'Behind' group for behind repos."""
         DEFAULT_GROUP_NAME = "Behind"
         DEFAULT_GROUP_COLOR = "#EF4444"  # Red color
         
         # Find existing group with this name
-        for group_id, group in self.groups.get('groups', {}).items():
-            if group.get('name') == DEFAULT_GROUP_NAME:
-                return group_id
+        group_id = self._name_to_id.get(DEFAULT_GROUP_NAME)
+        if group_id is not None:
+            return group_id
         
         # Create the group if it doesn't exist
         group = self.create_group(DEFAULT_GROUP_NAME, [], DEFAULT_GROUP_COLOR)
         return group['id']
     
+    @_locked
     def get_or_create_default_diverged_group(self) -> str:
         """Get or create the default 'Diverged' group for diverged repos."""
         DEFAULT_GROUP_NAME = "Diverged"
         DEFAULT_GROUP_COLOR = "#F59E0B"  # Orange/amber color
         
         # Find existing group with this name
-        for group_id, group in self.groups.get('groups', {}).items():
-            if group.get('name') == DEFAULT_GROUP_NAME:
-                return group_id
+        group_id = self._name_to_id.get(DEFAULT_GROUP_NAME)
+        if group_id is not None:
+            return group_id
         
         # Create the group if it doesn't exist
         group = self.create_group(DEFAULT_GROUP_NAME, [], DEFAULT_GROUP_COLOR)
         return group['id']
     
+    @_locked
+    def sync_status_groups(self, repos: List[Dict]):
+        """Sync the default 'Behind' and 'Diverged' groups from one pass over repos.
+        
+        Same result as sync_behind_repos_to_default_group() followed by
+        sync_diverged_repos_to_default_group(), but both groups are updated with a
+        single write.
+        """
+        self._sync_status_groups(repos, ('behind', 'diverged'))
+    
+    @_locked
     def sync_behind_repos_to_default_group(self, repos: List[Dict]):
         """Automatically sync repos with 'behind' status to the default 'Behind' group.
         
         This function ensures the 'Behind' group always contains exactly the repos
         that have 'behind' status. It adds repos that are behind and removes repos
-        that are no longer behind.
+        that are no longer behind. Prefer sync_status_groups() when syncing both groups.
         """
-        group_id = self.get_or_create_default_behind_group()
-        group = self.groups['groups'][group_id]
-        
-        # Get current repos in the group
-        current_repos = set(group.get('repos', []))
-        
-        # Find all repos that are behind from the provided repos
-        behind_repos = set()
-        for repo in repos:
-            status = repo.get('status', {})
-            if status.get('state') == 'behind':
-                behind_repos.add(repo['name'])
-        
-        # Add repos that are behind but not in the group
-        repos_to_add = behind_repos - current_repos
-        for repo_name in repos_to_add:
-            if repo_name not in group['repos']:
-                group['repos'].append(repo_name)
-        
-        # Remove repos that are no longer behind but are in the group
-        # Only remove repos that we've checked (in the provided repos list)
-        checked_repo_names = {repo['name'] for repo in repos}
-        repos_to_remove = (current_repos & checked_repo_names) - behind_repos
-        for repo_name in repos_to_remove:
-            if repo_name in group['repos']:
-                group['repos'].remove(repo_name)
-        
-        # Save if there were changes
-        if repos_to_add or repos_to_remove:
-            self._save_groups()
+        self._sync_status_groups(repos, ('behind',))
     
+    @_locked
     def sync_diverged_repos_to_default_group(self, repos: List[Dict]):
         """Automatically sync repos with 'diverged' status to the default 'Diverged' group.
         
         This function ensures the 'Diverged' group always contains exactly the repos
         that have 'diverged' status. It adds repos that are diverged and removes repos
-        that are no longer diverged.
+        that are no longer diverged. Prefer sync_status_groups() when syncing both groups.
         """
-        group_id = self.get_or_create_default_diverged_group()
-        group = self.groups['groups'][group_id]
+        self._sync_status_groups(repos, ('diverged',))
+    
+    def _sync_status_groups(self, repos: List[Dict], states: Tuple[str, ...]):
+        """Make each default status group contain exactly the repos in that state.
         
-        # Get current repos in the group
-        current_repos = set(group.get('repos', []))
+        Only repos in the provided list are added or removed, so syncing a single
+        repo leaves the rest of the group alone.
         
-        # Find all repos that are diverged from the provided repos
-        diverged_repos = set()
+        Args:
+            repos: Repository info dicts with 'name' and 'status'
+            states: Status states to sync, each mapped to its default group
+        """
+        group_for_state = {
+            'behind': ("Behind", self.get_or_create_default_behind_group),
+            'diverged': ("Diverged", self.get_or_create_default_diverged_group),
+        }
+        # Same list object as last time (e.g. a cached scan on every poll): nothing changed
+        states = [state for state in states
+                  if self._synced_from.get(group_for_state[state][0]) is not repos]
+        if not states:
+            return
+        
+        # One pass over the repos for every group being synced
+        checked_repo_names = set()
+        in_state: Dict[str, set] = {state: set() for state in states}
         for repo in repos:
-            status = repo.get('status', {})
-            if status.get('state') == 'diverged':
-                diverged_repos.add(repo['name'])
-        
-        # Add repos that are diverged but not in the group
-        repos_to_add = diverged_repos - current_repos
-        for repo_name in repos_to_add:
-            if repo_name not in group['repos']:
-                group['repos'].append(repo_name)
-        
-        # Remove repos that are no longer diverged but are in the group
-        # Only remove repos that we've checked (in the provided repos list)
-        checked_repo_names = {repo['name'] for repo in repos}
-        repos_to_remove = (current_repos & checked_repo_names) - diverged_repos
-        for repo_name in repos_to_remove:
-            if repo_name in group['repos']:
-                group['repos'].remove(repo_name)
-        
-        # Save if there were changes
-        if repos_to_add or repos_to_remove:
-            self._save_groups()
+            name = repo['name']
+            checked_repo_names.add(name)
+            status = repo.get('status')
+            if status is not None:
+                names_in_state = in_state.get(status.get('state'))
+                if names_in_state is not None:
+                    names_in_state.add(name)
+        
+        # Every change (including creating a default group) is persisted in one write
+        groups = self.groups['groups']
+        with self.batch():
+            for state in states:
+                group_id = group_for_state[state][1]()
+                group = groups[group_id]
+                current_repos = self._group_repos.setdefault(group_id, set())
+                if not current_repos and not in_state[state]:
+                    # Steady state: nothing in this state and nothing to take out
+                    continue
+                
+                # Add repos in this state that are not in the group yet, and remove repos
+                # that are no longer in this state; only repos we've checked (in the provided
+                # repos list) are removed
+                repos_to_add = in_state[state] - current_repos
+                repos_to_remove = (current_repos & checked_repo_names) - in_state[state]
+                
+                group['repos'].extend(repos_to_add)
+                self._index_repos(group_id, repos_to_add)
+                if repos_to_remove:
+                    group['repos'] = [r for r in group['repos'] if r not in repos_to_remove]
+                    self._unindex_repos(group_id, repos_to_remove)
+                
+                if repos_to_add or repos_to_remove:
+                    self._record({"op": "group_repos", "id": group_id,
+                                  "add": list(repos_to_add), "remove": list(repos_to_remove)})
+        for state in states:
+            self._synced_from[group_for_state[state][0]] = repos
     
+    @_locked
     def get_group_repos(self, group_name: str) -> List[str]:
         """Get all repositories in a group by name."""
-        for group in self.groups.get('groups', {}).values():
-            if group.get('name') == group_name:
-                return group.get('repos', [])
-        return []
+        group_id = self._name_to_id.get(group_name)
+        if group_id is None:
+            return []
+        return list(self.groups['groups'][group_id]['repos'])
 
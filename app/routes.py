@@ -1,13 +1,23 @@
 """HTTP API and page routes."""
 import os
+import re
+import threading
 import traceback
-from flask import Blueprint, render_template, jsonify, request
+from collections import OrderedDict
+from flask import Blueprint, Response, current_app, render_template, jsonify, request, stream_with_context
 from app.services import get_services, APP_VERSION
 from app.auth import api_key_required, check_api_key, unauthorized_response
 from app.guards import is_read_only, read_only_response
 
 bp = Blueprint('git_repo_manager', __name__)
 
+# Serialized /api/repos bodies, keyed by the normalized query (see list_repos). Bounded so
+# clients sending many different filters can't grow it without limit; least recently used
+# entries are dropped first.
+REPOS_RESPONSE_CACHE_SIZE = 32
+_repos_responses: "OrderedDict[tuple, dict]" = OrderedDict()
+_repos_responses_lock = threading.Lock()
+
 
 
 @bp.route('/')
@@ -31,7 +41,7 @@ def health():
         "status": status,
         "git_path": gp,
         "git_path_ok": git_ok,
-        "read_only": bool(s.settings.get("read_only", False)),
+        "read_only": bool(s.settings.read_only),
     })
 
 
@@ -42,72 +52,144 @@ def public_config():
     return jsonify({
         "version": APP_VERSION,
         "api_key_required": api_key_required(),
-        "read_only": bool(s.settings.get("read_only", False)),
-        "block_pull_on_dirty": bool(s.settings.get("block_pull_on_dirty", True)),
+        "read_only": bool(s.settings.read_only),
+        "block_pull_on_dirty": bool(s.settings.block_pull_on_dirty),
     })
 
 
+def _environ_without_etag_encoding():
+    """Request environ with Flask-Compress's ":<encoding>" suffix removed from If-None-Match.
+    
+    Compressed responses carry ETag "<hash>:br" (or :gzip), so clients send that back;
+    strip it so it compares equal to the ETag of the uncompressed body.
+    """
+    environ = request.environ
+    if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and ':' in if_none_match:
+        environ = dict(environ)
+        environ['HTTP_IF_NONE_MATCH'] = re.sub(r':(?:br|gzip|deflate)"', '"', if_none_match)
+    return environ
+
+
+def _repo_filter():
+    """Predicate for the search/status/group/tag query filters, or None when none is set."""
+    search = request.args.get('search', '').lower()
+    status_filter = request.args.get('status')
+    group_filter = request.args.get('group')
+    tag_filter = request.args.get('tag')
+    if not (search or status_filter or group_filter or tag_filter):
+        return None
+    
+    def keep(r):
+        return ((not search or search in r['name'].lower())
+                and (not status_filter or r.get('status', {}).get('state') == status_filter)
+                and (not group_filter or group_filter in r.get('groups', ()))
+                and (not tag_filter or tag_filter in r.get('tags', ())))
+    return keep
+
+
 @bp.route('/api/repos', methods=['GET'])
 def list_repos():
     """List all repositories with their status."""
     try:
+        s = get_services()
+        args = request.args
         # Check for force_refresh parameter
-        force_refresh = request.args.get('force_refresh', 'false').lower() == 'true'
+        force_refresh = args.get('force_refresh', 'false').lower() == 'true'
+        
+        # Optional pagination (?offset=&limit=); without either, return every match
+        paginate = 'offset' in args or 'limit' in args
+        try:
+            offset = max(0, int(args.get('offset', 0)))
+            limit = max(0, int(args.get('limit', 100)))
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "error": "offset and limit must be integers"
+            }), 400
         
         # Get batch processing settings
-        batch_size = get_services().settings.get("batch_size", 10)
-        parallel_workers = get_services().settings.get("parallel_workers", 5)
+        batch_size, parallel_workers = s.settings.batch_size, s.settings.parallel_workers
         
         # Use cache if available
-        repos = get_services().scanner.scan_all_repos(
+        repos = s.scanner.scan_all_repos(
             force_refresh=force_refresh, 
-            cache_manager=get_services().cache_manager,
+            cache_manager=s.cache_manager,
             batch_size=batch_size,
             parallel_workers=parallel_workers
         )
         
-        # Automatically sync behind repos to default "Behind" group
-        get_services().repo_groups.sync_behind_repos_to_default_group(repos)
-        # Automatically sync diverged repos to default "Diverged" group
-        get_services().repo_groups.sync_diverged_repos_to_default_group(repos)
+        # Automatically sync behind/diverged repos to the default "Behind"/"Diverged" groups
+        s.repo_groups.sync_status_groups(repos)
+        
+        # Same query against the same scan and unchanged groups/tags: reuse the serialized
+        # response instead of decorating, filtering, sorting and encoding again
+        scanned = repos
+        # Only what changes the body goes into the key; unknown parameters are ignored
+        sort_by = args.get('sort', 'name')
+        response_key = (
+            args.get('search', '').lower(), args.get('status', ''), args.get('group', ''),
+            args.get('tag', ''), sort_by if sort_by in ('name', 'status', 'date') else '',
+            (offset, limit) if paginate else None, args.get('pretty') == '1',
+        )
+        with _repos_responses_lock:
+            cached = _repos_responses.get(response_key)
+            if cached and cached["repos"] is not scanned:
+                # Built from a superseded scan: drop it so it doesn't keep that list alive
+                del _repos_responses[response_key]
+                cached = None
+            elif cached:
+                _repos_responses.move_to_end(response_key)
+        if cached and cached["groups_revision"] == s.repo_groups.revision:
+            response = current_app.response_class(cached["body"], mimetype='application/json')
+            response.set_etag(cached["etag"])
+            return response.make_conditional(_environ_without_etag_encoding())
+        groups_revision = s.repo_groups.revision
         
         # Add groups and tags to each repo
+        groups_idx, tags_idx = s.repo_groups.build_index()
         for repo in repos:
-            repo['groups'] = get_services().repo_groups.get_repo_groups(repo['name'])
-            repo['tags'] = get_services().repo_groups.get_tags(repo['name'])
-        
-        # Apply filters
-        search = request.args.get('search', '').lower()
-        status_filter = request.args.get('status')
-        group_filter = request.args.get('group')
-        tag_filter = request.args.get('tag')
+            repo['groups'] = groups_idx.get(repo['name'], [])
+            repo['tags'] = tags_idx.get(repo['name'], [])
         
-        if search:
-            repos = [r for r in repos if search in r['name'].lower()]
+        # Apply filters in one pass over the repos (skipped when none is set)
+        keep = _repo_filter()
+        if keep:
+            repos = [r for r in repos if keep(r)]
         
-        if status_filter:
-            repos = [r for r in repos if r.get('status', {}).get('state') == status_filter]
-        
-        if group_filter:
-            repos = [r for r in repos if group_filter in r.get('groups', [])]
-        
-        if tag_filter:
-            repos = [r for r in repos if tag_filter in r.get('tags', [])]
-        
-        # Sort options
-        sort_by = request.args.get('sort', 'name')
+        # Sort options (into a new list: unfiltered, repos is the cached scan that other
+        # request threads are reading, and list.sort() empties a list while it sorts)
         if sort_by == 'name':
-            repos.sort(key=lambda x: x['name'])
+            repos = sorted(repos, key=lambda x: x['name'])
         elif sort_by == 'status':
-            repos.sort(key=lambda x: x.get('status', {}).get('state', ''))
+            repos = sorted(repos, key=lambda x: x.get('status', {}).get('state', ''))
         elif sort_by == 'date':
-            repos.sort(key=lambda x: x.get('last_commit', {}).get('date', ''), reverse=True)
-        
-        return jsonify({
-            "success": True,
-            "repos": repos,
-            "count": len(repos)
-        }), 200, {'Content-Type': 'application/json'}
+            repos = sorted(repos, key=lambda x: x.get('last_commit', {}).get('date', ''), reverse=True)
+        
+        total = len(repos)
+        payload = {"success": True}
+        if paginate:
+            repos = repos[offset:offset + limit]
+            payload.update(offset=offset, limit=limit)
+        
+        payload.update(repos=repos, count=len(repos), total=total)
+        # Content-hash ETag: an unchanged poll with If-None-Match gets an empty 304
+        response = jsonify(payload)
+        response.add_etag()
+        with _repos_responses_lock:
+            # Entries for other queries built from an older scan can never be served again
+            for key in [k for k, v in _repos_responses.items() if v["repos"] is not scanned]:
+                del _repos_responses[key]
+            _repos_responses[response_key] = {
+                "repos": scanned,
+                "groups_revision": groups_revision,
+                "body": response.get_data(),
+                "etag": response.get_etag()[0],
+            }
+            _repos_responses.move_to_end(response_key)
+            while len(_repos_responses) > REPOS_RESPONSE_CACHE_SIZE:
+                _repos_responses.popitem(last=False)
+        return response.make_conditional(_environ_without_etag_encoding())
     except Exception as e:
         return jsonify({
             "success": False,
@@ -115,17 +197,53 @@ def list_repos():
         }), 500
 
 
+@bp.route('/api/repos/stream', methods=['GET'])
+def stream_repos():
+    """Stream repositories as newline-delimited JSON, one line per repo as soon as it is scanned.
+    
+    Takes the same force_refresh/search/status/group/tag parameters as /api/repos; lines
+    arrive in scan completion order (no sorting or pagination).
+    """
+    s = get_services()
+    force_refresh = request.args.get('force_refresh', 'false').lower() == 'true'
+    keep = _repo_filter()
+    json_provider = current_app.json
+    
+    def generate():
+        try:
+            for repo in s.scanner.iter_scan_repos(
+                force_refresh=force_refresh,
+                cache_manager=s.cache_manager,
+                parallel_workers=s.settings.parallel_workers,
+            ):
+                # Keep the Behind/Diverged groups in step with each repo as it arrives
+                s.repo_groups.sync_status_groups([repo])
+                repo['groups'] = s.repo_groups.get_repo_groups(repo['name'])
+                repo['tags'] = s.repo_groups.get_tags(repo['name'])
+                if keep is None or keep(repo):
+                    yield json_provider.dumps(repo) + "\n"
+        except Exception as e:
+            # Headers are already sent; report the failure as a final line
+            yield json_provider.dumps({"success": False, "error": str(e)}) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @bp.route('/api/repos/batch', methods=['GET'])
 def list_repos_batch():
     """List repositories in batches for progressive loading."""
     try:
+        s = get_services()
+        args = request.args
+        default_batch_size, parallel_workers = s.settings.batch_size, s.settings.parallel_workers
+        
         # Get batch parameters
-        batch_index = int(request.args.get('batch', 0))
-        batch_size = int(request.args.get('batch_size', get_services().settings.get("batch_size", 10)))
-        force_refresh = request.args.get('force_refresh', 'false').lower() == 'true'
+        batch_index = int(args.get('batch', 0))
+        batch_size = int(args.get('batch_size', default_batch_size))
+        force_refresh = args.get('force_refresh', 'false').lower() == 'true'
         
         # Get all repository names first (fast operation)
-        all_repo_names = get_services().scanner.find_repositories()
+        all_repo_names = s.scanner.find_repositories(force_refresh)
         total_repos = len(all_repo_names)
         
         # Calculate batch range
@@ -144,26 +262,22 @@ def list_repos_batch():
         # Get batch of repo names
         batch_repo_names = all_repo_names[start_idx:end_idx]
         
-        # Get parallel workers setting for batch processing
-        parallel_workers = get_services().settings.get("parallel_workers", 10)
-        
         # Scan this batch with parallel processing
-        repos = get_services().scanner.scan_repos_batch(
+        repos = s.scanner.scan_repos_batch(
             batch_repo_names, 
             force_refresh=force_refresh, 
-            cache_manager=get_services().cache_manager,
+            cache_manager=s.cache_manager,
             parallel_workers=parallel_workers
         )
         
-        # Automatically sync behind repos to default "Behind" group
-        get_services().repo_groups.sync_behind_repos_to_default_group(repos)
-        # Automatically sync diverged repos to default "Diverged" group
-        get_services().repo_groups.sync_diverged_repos_to_default_group(repos)
+        # Automatically sync behind/diverged repos to the default "Behind"/"Diverged" groups
+        s.repo_groups.sync_status_groups(repos)
         
         # Add groups and tags to each repo
+        groups_idx, tags_idx = s.repo_groups.build_index()
         for repo in repos:
-            repo['groups'] = get_services().repo_groups.get_repo_groups(repo['name'])
-            repo['tags'] = get_services().repo_groups.get_tags(repo['name'])
+            repo['groups'] = groups_idx.get(repo['name'], [])
+            repo['tags'] = tags_idx.get(repo['name'], [])
         
         return jsonify({
             "success": True,
@@ -185,11 +299,13 @@ def list_repo_names():
     """Get just the list of repository names (fast, for batch loading)."""
     try:
         repo_names = get_services().scanner.find_repositories()
-        return jsonify({
+        response = jsonify({
             "success": True,
             "repos": repo_names,
             "total": len(repo_names)
         })
+        response.add_etag()
+        return response.make_conditional(_environ_without_etag_encoding())
     except Exception as e:
         return jsonify({
             "success": False,
@@ -272,10 +388,8 @@ def pull_repo(repo_name):
             # Get fresh repo info (bypasses cache since we just invalidated it)
             repo_info = get_services().scanner.get_repo_info(repo_name)
             if repo_info:
-                # Sync the behind group with this single repo update
-                get_services().repo_groups.sync_behind_repos_to_default_group([repo_info])
-                # Sync the diverged group with this single repo update
-                get_services().repo_groups.sync_diverged_repos_to_default_group([repo_info])
+                # Sync the behind/diverged groups with this single repo update
+                get_services().repo_groups.sync_status_groups([repo_info])
                 
                 # Add groups and tags
                 repo_info['groups'] = get_services().repo_groups.get_repo_groups(repo_name)
@@ -313,20 +427,17 @@ def pull_all_repos():
             pull_strategy=pull_strategy,
             force=force,
             block_on_dirty=block_on_dirty,
+            parallel_workers=get_services().settings.get("parallel_workers", 5),
         )
         status_code = 200 if result["success"] else 207  # Multi-status
         
-        # After pulling all repos, rescan and sync the behind group
+        # Pulled repos were rescanned as part of the pull; sync the behind group from those
+        repos = result.pop("repos", [])
         if result["success"]:
-            # Rescan all repos to get updated status
-            repos = get_services().scanner.scan_all_repos(
-                force_refresh=True,  # Force refresh to get latest status
-                cache_manager=get_services().cache_manager,
-                batch_size=get_services().settings.get("batch_size", 10),
-                parallel_workers=get_services().settings.get("parallel_workers", 5)
-            )
-            get_services().repo_groups.sync_behind_repos_to_default_group(repos)
-            get_services().repo_groups.sync_diverged_repos_to_default_group(repos)
+            # Every repo was pulled and rescanned: that is a full scan, so cache it as one
+            if len(repos) == len(repo_names):
+                get_services().scanner.cache_scan(get_services().cache_manager, repos)
+            get_services().repo_groups.sync_status_groups(repos)
         
         return jsonify(result), status_code
     except Exception as e:
@@ -388,6 +499,19 @@ def list_schedules():
         }), 500
 
 
+def _resolve_schedule_repos(repos, groups):
+    """Direct repos followed by the repos of each named group, duplicates removed (order kept)."""
+    repo_groups = get_services().repo_groups
+    seen = set()
+    resolved = []
+    for repo_list in [repos] + [repo_groups.get_group_repos(g) for g in groups]:
+        for repo_name in repo_list:
+            if repo_name not in seen:
+                seen.add(repo_name)
+                resolved.append(repo_name)
+    return resolved
+
+
 @bp.route('/api/schedules', methods=['POST'])
 def create_schedule():
     """Create a new schedule."""
@@ -406,16 +530,7 @@ def create_schedule():
             }), 400
         
         # Resolve groups to repositories
-        resolved_repos = list(repos)  # Start with direct repos
-        for group_name in groups:
-            # Find the group and add its repositories
-            all_groups = get_services().repo_groups.get_groups()
-            group = next((g for g in all_groups if g['name'] == group_name), None)
-            if group:
-                resolved_repos.extend(group.get('repos', []))
-        
-        # Remove duplicates while preserving order
-        resolved_repos = list(dict.fromkeys(resolved_repos))
+        resolved_repos = _resolve_schedule_repos(repos, groups)
         
         schedule = get_services().schedule_manager.create_schedule(
             name=name,
@@ -450,17 +565,7 @@ def update_schedule(schedule_id):
         
         # Resolve groups to repositories if groups are provided
         if groups:
-            resolved_repos = list(repos)  # Start with direct repos
-            for group_name in groups:
-                # Find the group and add its repositories
-                all_groups = get_services().repo_groups.get_groups()
-                group = next((g for g in all_groups if g['name'] == group_name), None)
-                if group:
-                    resolved_repos.extend(group.get('repos', []))
-            
-            # Remove duplicates while preserving order
-            resolved_repos = list(dict.fromkeys(resolved_repos))
-            data['repos'] = resolved_repos
+            data['repos'] = _resolve_schedule_repos(repos, groups)
         
         schedule = get_services().schedule_manager.update_schedule(schedule_id, **data)
         
@@ -531,22 +636,14 @@ def get_stats():
 
         repos = cached_repos
 
-        status_counts = {
-            'behind': 0,
-            'ahead': 0,
-            'up_to_date': 0,
-            'diverged': 0,
-            'no_remote': 0,
-            'error': 0
-        }
+        # The full scan caches its counts alongside the list; only count here when
+        # stats come from per-repo entries or the summary no longer matches 'all'
+        summary = get_services().cache_manager.get('all_summary')
+        if summary is None or summary["repos"] is not repos:
+            summary = get_services().scanner.summarize_repos(repos or [])
+        status_counts = summary["status_counts"]
+        repos_with_changes = summary["repos_with_changes"]
         total_repos = total_repo_count if total_repo_count else (len(repos) if repos else 0)
-        repos_with_changes = sum(1 for r in repos if r.get('is_dirty', False)) if repos else 0
-
-        if repos:
-            for repo in repos:
-                status = repo.get('status', {}).get('state', 'unknown')
-                if status in status_counts:
-                    status_counts[status] += 1
 
         activity_stats = get_services().activity_log.get_stats()
         message = None
@@ -873,11 +970,9 @@ def pull_all_group_repos(group_id):
                     repo_info['tags'] = get_services().repo_groups.get_tags(repo_name)
                     updated_repos.append(repo_info)
         
-        # Sync the behind group after updates
+        # Sync the behind/diverged groups after updates
         if updated_repos:
-            get_services().repo_groups.sync_behind_repos_to_default_group(updated_repos)
-            # Sync the diverged group after updates
-            get_services().repo_groups.sync_diverged_repos_to_default_group(updated_repos)
+            get_services().repo_groups.sync_status_groups(updated_repos)
         
         # Determine overall success
         all_success = all(r["success"] for r in results)
@@ -983,22 +1078,16 @@ def bulk_pull():
             pull_strategy=pull_strategy,
             force=force,
             block_on_dirty=block_on_dirty,
+            parallel_workers=get_services().settings.get("parallel_workers", 5),
         )
         status_code = 200 if result["success"] else 207
         
-        # After bulk pull, rescan updated repos and sync the behind group
+        # After bulk pull, sync the behind group from the repos rescanned during the pull
+        updated_repos = result.pop("repos", [])
         if result["success"]:
-            # Rescan the updated repos to get latest status
-            updated_repos = []
-            for repo_name in repo_names:
-                repo_info = get_services().scanner.get_repo_info(repo_name)
-                if repo_info:
-                    updated_repos.append(repo_info)
-            # Sync the behind group with updated repos
+            # Sync the behind/diverged groups with updated repos
             if updated_repos:
-                get_services().repo_groups.sync_behind_repos_to_default_group(updated_repos)
-                # Sync the diverged group with updated repos
-                get_services().repo_groups.sync_diverged_repos_to_default_group(updated_repos)
+                get_services().repo_groups.sync_status_groups(updated_repos)
         
         return jsonify(result), status_code
     except Exception as e:
@@ -1076,6 +1165,9 @@ def update_settings():
         if 'fetch_max_per_minute' in data:
             s.update_fetch_rate_from_settings()
 
+        if 'parallel_workers' in data:
+            s.update_worker_pool_from_settings()
+
         if 'git_path' in data:
             new_git_path = s.settings.get("git_path")
             if new_git_path != prev_git_path:
@@ -1121,6 +1213,7 @@ def reset_settings():
         s.settings.reset()
         s.cache_manager.update_ttl(s.settings.get("cache_ttl_seconds", 600))
         s.update_fetch_rate_from_settings()
+        s.update_worker_pool_from_settings()
         return jsonify({
             "success": True,
             "settings": s.settings.get_all()
@@ -1138,6 +1231,7 @@ def clear_cache():
     try:
         stats_before = get_services().cache_manager.get_stats()
         get_services().cache_manager.invalidate_all()
+        get_services().scanner.clear_repo_names_cache()
         stats_after = get_services().cache_manager.get_stats()
         
         return jsonify({
@@ -1,35 +1,53 @@
 """Scheduler for automatic git pull operations."""
-import json
+import itertools
 import os
 from pathlib import Path
 from typing import List, Dict, Optional
+import orjson
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from app.git_operations import GitOperations
 from app.activity_log import ActivityLog
+from app.json_files import load_json_file, safe_write
 
 
 class ScheduleManager:
     """Manages scheduled git pull operations."""
     
-    def __init__(self, base_path: str = "/git", config_file: str = "/app/schedules.json", activity_log=None, cache_manager=None):
-        """Initialize scheduler manager."""
+    def __init__(self, base_path: str = "/git", config_file: str = "/app/schedules.json", activity_log=None, cache_manager=None,
+                 operations: Optional[GitOperations] = None):
+        """Initialize scheduler manager.
+        
+        Args:
+            operations: GitOperations to run scheduled pulls with (e.g. the app's shared
+                instance); one is created for base_path if omitted
+        """
         self.base_path = base_path
         self.config_file = config_file
         self.scheduler = BackgroundScheduler()
         self.activity_log = activity_log
         self.cache_manager = cache_manager
-        self.operations = GitOperations(base_path=base_path, activity_log=activity_log, cache_manager=cache_manager)
+        if operations is None:
+            operations = GitOperations(base_path=base_path, activity_log=activity_log, cache_manager=cache_manager)
+        self.operations = operations
         self.schedules = self._load_schedules()
+        # Cron expression -> CronTrigger keyword arguments parsed from it
+        self._cron_cache: Dict[str, Dict] = {}
+        # Schedule id -> _job_signature() of the schedule its current job was built from
+        self._job_signatures: Dict[str, tuple] = {}
+        # Ids are handed out from a counter that continues after the highest existing id
+        self._schedule_ids = itertools.count(
+            max((int(sid.rpartition('_')[2]) for sid in self.schedules
+                 if sid.rpartition('_')[2].isdigit()), default=0) + 1
+        )
         self._start_scheduler()
     
     def _load_schedules(self) -> Dict:
         """Load schedules from config file."""
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r') as f:
-                    return json.load(f)
+                return load_json_file(self.config_file)
             except Exception:
                 return {}
         return {}
@@ -37,16 +55,10 @@ class ScheduleManager:
     def _save_schedules(self):
         """Save schedules to config file."""
         try:
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-            # Write to a temporary file first, then rename (atomic operation)
-            temp_file = self.config_file + '.tmp'
             # IMPORTANT: Only save what's currently in memory (self.schedules)
             # Do NOT read from file first, as that could restore deleted schedules
-            with open(temp_file, 'w') as f:
-                json.dump(self.schedules, f, indent=2)
-            # Atomic rename to ensure file is either fully written or not changed
-            os.replace(temp_file, self.config_file)
+            # Atomic replace to ensure file is either fully written or not changed
+            safe_write(self.config_file, orjson.dumps(self.schedules, option=orjson.OPT_INDENT_2))
         except Exception as e:
             print(f"Error saving schedules: {e}")
             raise  # Re-raise to ensure caller knows save failed
@@ -58,7 +70,7 @@ class ScheduleManager:
                 self.scheduler.shutdown(wait=False)
         except Exception as e:
             print(f"Scheduler shutdown: {e}")
-
+    
     def _start_scheduler(self):
         """Start the scheduler and load existing schedules."""
         if not self.scheduler.running:
@@ -69,12 +81,28 @@ class ScheduleManager:
         """Reload all scheduled jobs."""
         # Remove all existing jobs
         self.scheduler.remove_all_jobs()
+        self._job_signatures.clear()
         
         # Add jobs from schedules
         for schedule_id, schedule in self.schedules.items():
             if schedule.get('enabled', True):
                 self._add_job(schedule_id, schedule)
     
+    @staticmethod
+    def _job_signature(schedule: Dict) -> tuple:
+        """Schedule fields that go into its job (trigger and arguments).
+        
+        The repos list is copied into a tuple: editing the schedule's list in place must
+        not change a signature recorded earlier.
+        """
+        return (tuple(schedule.get(key) for key in
+                      ('type', 'value', 'hour', 'minute', 'day_of_week', 'cron', 'name'))
+                + (tuple(schedule.get('repos') or ()),))
+    
+    def _job_is_current(self, schedule_id: str, schedule: Dict) -> bool:
+        """Whether the scheduled job was built from the schedule as it is now."""
+        return self._job_signatures.get(schedule_id) == self._job_signature(schedule)
+    
     def _add_job(self, schedule_id: str, schedule: Dict):
         """Add a job to the scheduler."""
         repos = schedule.get('repos', [])
@@ -100,10 +128,14 @@ class ScheduleManager:
                 # Custom cron expression
                 cron_expr = schedule.get('cron', '0 0 * * *')  # Default: daily at midnight
                 try:
-                    # Parse cron expression (minute hour day month day-of-week)
-                    # APScheduler CronTrigger accepts parameters directly, not as string
-                    parts = cron_expr.strip().split()
-                    if len(parts) == 5:
+                    trigger_params = self._cron_cache.get(cron_expr)
+                    if trigger_params is None:
+                        # Parse cron expression (minute hour day month day-of-week)
+                        # APScheduler CronTrigger accepts parameters directly, not as string
+                        parts = cron_expr.strip().split()
+                        if len(parts) != 5:
+                            print(f"Invalid cron expression format: {cron_expr}")
+                            return
                         # Build trigger with proper parameter handling
                         trigger_params = {}
                         if parts[0] != '*':
@@ -116,10 +148,9 @@ class ScheduleManager:
                             trigger_params['month'] = parts[3]
                         if parts[4] != '*':
                             trigger_params['day_of_week'] = parts[4]
-                        trigger = CronTrigger(**trigger_params)
-                    else:
-                        print(f"Invalid cron expression format: {cron_expr}")
-                        return
+                    trigger = CronTrigger(**trigger_params)
+                    # Only expressions APScheduler accepted are kept
+                    self._cron_cache[cron_expr] = trigger_params
                 except Exception as e:
                     print(f"Invalid cron expression: {cron_expr}: {e}")
                     return
@@ -136,14 +167,17 @@ class ScheduleManager:
                 args=[repos, schedule_name],
                 replace_existing=True
             )
+            self._job_signatures[schedule_id] = self._job_signature(schedule)
         except Exception as e:
             print(f"Error adding job {schedule_id}: {e}")
     
     def _execute_schedule(self, repos: List[str], schedule_name: str = "Scheduled"):
         """Execute git pull for scheduled repositories."""
+        workers = 1
         try:
             from app.services import get_services
-            if get_services().settings.get("read_only", False):
+            settings = get_services().settings
+            if settings.get("read_only", False):
                 print("Scheduled pull skipped: read-only mode is enabled")
                 if self.activity_log:
                     self.activity_log.log_operation(
@@ -151,10 +185,12 @@ class ScheduleManager:
                         f"{schedule_name}: skipped (read-only mode)", {}
                     )
                 return
+            workers = max(1, int(settings.get("parallel_workers", 5)))
         except Exception as e:
             print(f"Read-only check: {e}")
         print(f"Executing scheduled pull for repos: {repos}")
-        for repo in repos:
+        
+        def pull_one(repo: str):
             try:
                 result = self.operations.pull_repo(repo)
                 print(f"Schedule pull result for {repo}: {result}")
@@ -172,13 +208,13 @@ class ScheduleManager:
                 print(f"Error pulling {repo}: {e}")
                 if self.activity_log:
                     self.activity_log.log_operation('scheduled_pull', repo, 'error', str(e))
+        
+        self.operations.map_pulls(pull_one, repos, workers)
     
     def create_schedule(self, name: str, repos: List[str], schedule_type: str, 
                        value: Optional[str] = None, **kwargs) -> Dict:
         """Create a new schedule."""
-        import time
-        # Generate unique ID based on timestamp to avoid collisions
-        schedule_id = f"schedule_{int(time.time() * 1000)}"
+        schedule_id = f"schedule_{next(self._schedule_ids)}"
         
         schedule = {
             'id': schedule_id,
@@ -213,12 +249,15 @@ class ScheduleManager:
         schedule = self.schedules[schedule_id]
         try:
             if schedule.get('enabled', True):
-                self._add_job(schedule_id, schedule)
+                # Only rebuild the job if something it depends on changed
+                if not (self._job_is_current(schedule_id, schedule)
+                        and self.scheduler.get_job(schedule_id)):
+                    self._add_job(schedule_id, schedule)
             else:
-                try:
+                self._job_signatures.pop(schedule_id, None)
+                # Job might not exist (e.g. already disabled)
+                if self.scheduler.get_job(schedule_id) is not None:
                     self.scheduler.remove_job(schedule_id)
-                except Exception:
-                    pass  # Job might not exist
         except Exception as e:
             print(f"Error updating scheduler job for {schedule_id}: {e}")
         
@@ -231,11 +270,13 @@ class ScheduleManager:
             return False
         
         # Remove job from scheduler (whether enabled or disabled)
+        self._job_signatures.pop(schedule_id, None)
         try:
-            self.scheduler.remove_job(schedule_id)
-        except Exception as e:
             # Job might not exist (e.g., if schedule was disabled), that's okay
-            print(f"Note: Job {schedule_id} not found in scheduler: {e}")
+            if self.scheduler.get_job(schedule_id) is not None:
+                self.scheduler.remove_job(schedule_id)
+        except Exception as e:
+            print(f"Error removing job {schedule_id} from scheduler: {e}")
         
         # Remove from memory
         del self.schedules[schedule_id]
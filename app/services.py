@@ -1,5 +1,7 @@
 """Centralized application services (avoids scattered global reassignment)."""
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 from app.settings import Settings
@@ -21,6 +23,8 @@ class AppServices:
 
     def __init__(self, data_dir: str):
         self.data_dir = data_dir
+        # Serializes git_path reconfiguration (two concurrent settings saves)
+        self._reconfigure_lock = threading.Lock()
         self.settings = Settings(config_file=f"{data_dir}/settings.json")
 
         configured_git = self.settings.get("git_path", os.getenv("GIT_PATH", "/git"))
@@ -41,10 +45,16 @@ class AppServices:
         )
         self.fetch_rate_limiter = FetchRateLimiter(max_per_minute=fetch_max)
 
+        # One pool for concurrent scans and pulls, reused across requests
+        self.parallel_workers = self._parallel_workers_setting()
+        self.executor = self._make_executor(self.parallel_workers)
+
         self._current_git_path = git_path
         self.scanner = GitScanner(
             base_path=git_path,
             fetch_rate_limiter=self.fetch_rate_limiter,
+            max_workers=self.parallel_workers,
+            executor=self.executor,
         )
         self.activity_log = ActivityLog(log_file=f"{data_dir}/activity_log.json")
         self.operations = GitOperations(
@@ -52,12 +62,15 @@ class AppServices:
             activity_log=self.activity_log,
             cache_manager=self.cache_manager,
             fetch_rate_limiter=self.fetch_rate_limiter,
+            scanner=self.scanner,
+            executor=self.executor,
         )
         self.schedule_manager = ScheduleManager(
             base_path=git_path,
             config_file=f"{data_dir}/schedules.json",
             activity_log=self.activity_log,
             cache_manager=self.cache_manager,
+            operations=self.operations,
         )
         self.repo_groups = RepoGroups(config_file=f"{data_dir}/repo_groups.json")
 
@@ -85,26 +98,58 @@ class AppServices:
         return self._current_git_path
 
     def reconfigure_git_path(self, new_path: str) -> None:
-        """Recreate scanner/operations/scheduler after git_path change."""
-        self.schedule_manager.shutdown()
-        self.cache_manager.invalidate_all()
-        self._current_git_path = new_path
-        self.scanner = GitScanner(
-            base_path=new_path,
-            fetch_rate_limiter=self.fetch_rate_limiter,
-        )
-        self.operations = GitOperations(
-            base_path=new_path,
-            activity_log=self.activity_log,
-            cache_manager=self.cache_manager,
-            fetch_rate_limiter=self.fetch_rate_limiter,
-        )
-        self.schedule_manager = ScheduleManager(
-            base_path=new_path,
-            config_file=f"{self.data_dir}/schedules.json",
-            activity_log=self.activity_log,
-            cache_manager=self.cache_manager,
-        )
+        """Recreate scanner/operations/scheduler after git_path change.
+
+        The replacements are built first and swapped in together, so requests in flight
+        keep using a consistent old set instead of a half-rebuilt one.
+        """
+        with self._reconfigure_lock:
+            scanner = GitScanner(
+                base_path=new_path,
+                fetch_rate_limiter=self.fetch_rate_limiter,
+                max_workers=self.parallel_workers,
+                executor=self.executor,
+            )
+            operations = GitOperations(
+                base_path=new_path,
+                activity_log=self.activity_log,
+                cache_manager=self.cache_manager,
+                fetch_rate_limiter=self.fetch_rate_limiter,
+                scanner=scanner,
+                executor=self.executor,
+            )
+            # Stop the old scheduler before starting the new one so no job runs twice
+            self.schedule_manager.shutdown()
+            schedule_manager = ScheduleManager(
+                base_path=new_path,
+                config_file=f"{self.data_dir}/schedules.json",
+                activity_log=self.activity_log,
+                cache_manager=self.cache_manager,
+                operations=operations,
+            )
+            self.cache_manager.invalidate_all()
+            self._current_git_path = new_path
+            self.scanner, self.operations, self.schedule_manager = scanner, operations, schedule_manager
+
+    def _parallel_workers_setting(self) -> int:
+        return max(1, int(self.settings.get("parallel_workers", 5)))
+
+    @staticmethod
+    def _make_executor(workers: int) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="git-worker")
+
+    def update_worker_pool_from_settings(self) -> None:
+        """Swap in a pool sized to the parallel_workers setting (only if it changed)."""
+        workers = self._parallel_workers_setting()
+        if workers == self.parallel_workers:
+            return
+        # The old pool is not shut down: a request may still be about to submit to it.
+        # Once the last reference is gone its idle threads exit on their own.
+        self.parallel_workers = workers
+        self.executor = self._make_executor(workers)
+        self.scanner.executor = self.executor
+        self.scanner.max_workers = workers
+        self.operations.executor = self.executor
 
     def update_fetch_rate_from_settings(self) -> None:
         max_f = self.settings.get(
@@ -1,15 +1,24 @@
 """Application settings management."""
-import json
 import os
 from typing import Dict, Optional
 
+import orjson
+
+from app.json_files import load_json_file, safe_write
+
 
 class Settings:
-    """Manages application settings."""
+    """Manages application settings.
+    
+    Every default setting is also mirrored as an attribute (e.g. settings.parallel_workers)
+    for cheap reads on request paths; set/update/reset keep the attributes current.
+    """
     
     def __init__(self, config_file: str = "/app/data/settings.json"):
         """Initialize settings manager."""
         self.config_file = config_file
+        # Bytes last written to config_file, so saving unchanged settings is a no-op
+        self._saved_data: Optional[bytes] = None
         self.default_settings = {
             "git_path": "/git",  # Container path
             "host_git_path": os.getenv("HOST_GIT_PATH", "~/git"),  # Host path (from env or default)
@@ -29,29 +38,36 @@ class Settings:
             "block_pull_on_dirty": True,
         }
         self.settings = self._load_settings()
+        self._mirror_attributes()
     
     def _load_settings(self) -> Dict:
         """Load settings from config file."""
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r') as f:
-                    loaded = json.load(f)
-                    # Merge with defaults to ensure all keys exist
-                    settings = self.default_settings.copy()
-                    settings.update(loaded)
-                    return settings
+                loaded = load_json_file(self.config_file)
+                # Merge with defaults to ensure all keys exist
+                settings = self.default_settings.copy()
+                settings.update(loaded)
+                return settings
             except Exception as e:
                 print(f"Error loading settings: {e}")
                 return self.default_settings.copy()
         return self.default_settings.copy()
     
+    def _mirror_attributes(self):
+        """Copy the default settings' current values onto same-named attributes."""
+        settings = self.settings
+        for key in self.default_settings:
+            setattr(self, key, settings.get(key))
+    
     def _save_settings(self):
         """Save settings to config file."""
         try:
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-            with open(self.config_file, 'w') as f:
-                json.dump(self.settings, f, indent=2)
+            data = orjson.dumps(self.settings, option=orjson.OPT_INDENT_2)
+            if data == self._saved_data:
+                return
+            safe_write(self.config_file, data)
+            self._saved_data = data
         except Exception as e:
             print(f"Error saving settings: {e}")
     
@@ -62,11 +78,13 @@ class Settings:
     def set(self, key: str, value):
         """Set a setting value."""
         self.settings[key] = value
+        self._mirror_attributes()
         self._save_settings()
     
     def update(self, **kwargs):
         """Update multiple settings at once."""
         self.settings.update(kwargs)
+        self._mirror_attributes()
         self._save_settings()
     
     def get_all(self) -> Dict:
@@ -76,5 +94,6 @@ class Settings:
     def reset(self):
         """Reset settings to defaults."""
         self.settings = self.default_settings.copy()
+        self._mirror_attributes()
         self._save_settings()
 